@@ -2,22 +2,32 @@
 Unified ML API for Embedding and Reranking with GPU Acceleration.
 
 This API provides:
-- /embed: BGE-M3 ONNX INT8 embeddings (dense + sparse) on GPU
-- /rerank: BGE-Reranker-Base FP16 reranking on GPU
+- /embed: BGE-M3 ONNX INT8 embeddings (dense + sparse) on GPU, streamed as
+  NDJSON (dense vectors are base64-encoded float16 bytes)
+- /rerank: BGE-Reranker-Base ONNX reranking on GPU (FP16 by default, INT8
+  when a quantized export is configured)
 
 Both models are loaded at startup for "hot" API performance.
 Single port (8001) with path-based routing.
 """
 import os
 import gc
+import base64
 import time
 import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from contextlib import asynccontextmanager
-from typing import List, Dict, Union, Tuple
-
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from typing import List, Dict, Optional, Union, Tuple
+
+from cachetools import LRUCache
+import msgpack
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 import numpy as np
 
 # CRITICAL: Set cache directories BEFORE any HuggingFace imports
@@ -31,9 +41,13 @@ os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
 print(f"🔧 HF_HOME set to: {MODELS_CACHE_DIR}")
 
 # NOW import HuggingFace libraries (after env vars are set)
-from optimum.onnxruntime import ORTModelForCustomTasks
+import onnx
+import onnxruntime as ort
+import torch
+from huggingface_hub import hf_hub_download
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTOptimizer
+from optimum.onnxruntime.configuration import OptimizationConfig
 from transformers import AutoTokenizer
-from FlagEmbedding import FlagReranker
 
 
 
@@ -41,10 +55,20 @@ from FlagEmbedding import FlagReranker
 # Embedding Model Config
 EMBED_MODEL_ID = "BAAI/bge-m3"
 EMBED_ONNX_MODEL_ID = "gpahal/bge-m3-onnx-int8"
+EMBED_ONNX_FILE_NAME = "model_quantized.onnx"
+# Local static QDQ INT8 artifact (see quantize_models.py); overrides the hub model
+EMBED_ONNX_MODEL_PATH = os.getenv("EMBED_ONNX_MODEL_PATH")
+EMBED_MAX_SEQ_LENGTH = 512
+EMBED_DENSE_DIM = 1024
+# Max longest/shortest token-length ratio within one device batch
+EMBED_BUCKET_MAX_RATIO = 1.5
 EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
-EMBED_BATCH_TIMEOUT_S = 0.01
+EMBED_BATCH_TIMEOUT_S = float(os.getenv("EMBED_BATCH_TIMEOUT", "0.01"))
+# Wider batching window used when requests are already waiting on wakeup
+EMBED_BUSY_BATCH_TIMEOUT_S = float(os.getenv("EMBED_BUSY_BATCH_TIMEOUT", "0.025"))
 EMBED_MAX_QUEUE_SIZE = 500
 EMBED_MAX_TEXTS_PER_REQUEST = 128
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
 QUERY_PREFIX = "Represent this sentence for searching relevant passages: "
 
 # Rerank Model Config
@@ -52,28 +76,137 @@ RERANK_MODEL_ID = "BAAI/bge-reranker-base"
 RERANK_MAX_BATCH_SIZE = int(os.getenv("RERANK_MAX_BATCH_SIZE", "16"))
 RERANK_BATCH_TIMEOUT_S = float(os.getenv("RERANK_BATCH_TIMEOUT", "0.02"))
 RERANK_MAX_QUEUE_SIZE = 100
+RERANK_MAX_SEQ_LENGTH = 512
+RERANK_INFERENCE_BATCH_SIZE = int(os.getenv("RERANK_INFERENCE_BATCH_SIZE", "64"))
+# Static QDQ INT8 export (see quantize_models.py); without it the model
+# is exported to ONNX once, converted to FP16 and cached under
+# MODELS_CACHE_DIR
+RERANK_ONNX_MODEL_PATH = os.getenv("RERANK_ONNX_MODEL_PATH")
+RERANK_ONNX_EXPORT_DIR = MODELS_CACHE_DIR / "bge-reranker-base-onnx"
+RERANK_ONNX_EXPORT_FILE_NAME = "model.onnx"
+# ORTOptimizer saves its output with this suffix next to the export
+RERANK_ONNX_FP16_SUFFIX = "fp16"
+RERANK_ONNX_FILE_NAME = (
+    "model_quantized.onnx"
+    if RERANK_ONNX_MODEL_PATH
+    else f"model_{RERANK_ONNX_FP16_SUFFIX}.onnx"
+)
+
+# ONNX Runtime CUDA provider options for the embedding session
+EMBED_GPU_MEM_LIMIT = int(os.getenv("EMBED_GPU_MEM_LIMIT", str(8 * 1024**3)))
+EMBED_CUDA_PROVIDER_OPTIONS = {
+    "device_id": 0,
+    "arena_extend_strategy": "kNextPowerOfTwo",
+    "gpu_mem_limit": EMBED_GPU_MEM_LIMIT,
+    "cudnn_conv_algo_search": "EXHAUSTIVE",
+    "do_copy_in_default_stream": True,
+}
+EMBED_WARMUP_BATCH_SIZES = sorted({1, 8, EMBED_MAX_BATCH_SIZE})
+# Capture fixed (batch_size, seq_len) shapes as CUDA graphs; a device batch
+# is padded up to the smallest shape that fits and the graph is replayed.
+# Candidates that do not fit the EMBED_MAX_BATCH_SIZE buffers are dropped;
+# the rest are ordered by batch_size * seq_len.
+EMBED_CUDA_GRAPH = os.getenv("EMBED_CUDA_GRAPH", "1") == "1"
+EMBED_GRAPH_CANDIDATE_SHAPES = [
+    (1, 64),
+    (1, 128),
+    (8, 256),
+    (16, 128),
+    (32, 128),
+    (32, 256),
+]
+
+
+def build_graph_shapes(
+    max_batch_size: int, max_seq_length: int
+) -> List[Tuple[int, int]]:
+    """
+    Return the graph shapes that fit the IO-binding buffers, smallest first.
+
+    The buffers hold max_batch_size rows of max_seq_length tokens, so any
+    candidate with more rows or more tokens than that is dropped.
+    """
+    shapes = {
+        (batch_size, seq_len)
+        for batch_size, seq_len in EMBED_GRAPH_CANDIDATE_SHAPES
+        if batch_size <= max_batch_size
+        and seq_len <= max_seq_length
+        and batch_size * seq_len <= max_batch_size * max_seq_length
+    }
+    shapes.add((max_batch_size, max_seq_length))
+    return sorted(shapes, key=lambda shape: shape[0] * shape[1])
+
+
+EMBED_GRAPH_SHAPES = build_graph_shapes(EMBED_MAX_BATCH_SIZE, EMBED_MAX_SEQ_LENGTH)
+# A batch replays a graph only if padding to its shape costs at most this many
+# times the batch's own padded tokens; otherwise it runs eagerly at its own
+# shape, so length bucketing is not undone by padding up to a big graph.
+EMBED_GRAPH_MAX_PAD_RATIO = 2.0
+# Below this many tokens a run is launch-bound, so a graph always pays off
+EMBED_GRAPH_MIN_PAD_TOKENS = 128
+EMBED_GRAPH_WARMUP_RUNS = 3
 
 
 
 
 model_resources = {
     "embed_tokenizer": None,
-    "embed_model": None,
+    "query_prefix_ids": None,
+    "special_token_mask": None,
+    "embed_session": None,
+    "embed_io_binding": None,
+    "embed_buffers": None,
+    "embed_graph_shapes": [],
+    "embed_graph_run_options": [],
+    "embed_eager_run_options": None,
+    "rerank_tokenizer": None,
     "reranker": None,
+    "rerank_precision": None,
 }
 
 
 
 
+def drain_queue(
+    queue: deque,
+    not_empty: asyncio.Event,
+    slots: asyncio.Semaphore,
+    max_items: int,
+) -> List[tuple]:
+    """
+    Pop up to max_items queued requests in one go.
+
+    Frees their queue slots and leaves not_empty set only if work remains.
+    """
+    batch_data = [queue.popleft() for _ in range(min(len(queue), max_items))]
+    for _ in batch_data:
+        slots.release()
+    if queue:
+        not_empty.set()
+    else:
+        not_empty.clear()
+    return batch_data
+
+
+
+
 class EmbedBatcher:
     """Async batching for embedding requests."""
 
     def __init__(self):
-        self.queue = asyncio.Queue(maxsize=EMBED_MAX_QUEUE_SIZE)
+        # Single consumer, so a plain deque suffices; the semaphore bounds its
+        # size and the event wakes the loop, with no future per queued item
+        self.queue: deque = deque()
+        self._not_empty = asyncio.Event()
+        self._slots = asyncio.Semaphore(EMBED_MAX_QUEUE_SIZE)
         self.processing_loop_task = None
+        self.executor = None
 
     async def start(self):
         """Start the background processing loop."""
+        # Single worker: GPU calls are serialized instead of contending
+        # for the CUDA context from the shared default thread pool
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
         self.processing_loop_task = asyncio.create_task(self._process_loop())
         print("✅ Embed batch processor started.")
 
@@ -85,135 +218,416 @@ class EmbedBatcher:
                 await self.processing_loop_task
             except asyncio.CancelledError:
                 pass
+        if self.executor:
+            self.executor.shutdown(wait=True)
+
+    async def process(
+        self, texts: List[str], is_query: bool = False
+    ) -> List[asyncio.Future]:
+        """
+        Add work to the queue and return one future per text.
 
-    async def process(self, texts: List[str]) -> dict:
-        """Add work to the queue and await result."""
+        Each future resolves to that text's (dense, sparse) pair.
+        """
         loop = asyncio.get_running_loop()
-        future = loop.create_future()
-        await self.queue.put((texts, future))
-        return await future
+        futures = [loop.create_future() for _ in texts]
+        await self._slots.acquire()
+        self.queue.append((texts, is_query, futures))
+        self._not_empty.set()
+        return futures
 
     async def _process_loop(self):
         """Collect requests and run inference in batches."""
+        loop = asyncio.get_running_loop()
         while True:
-            batch_data = []
-
             try:
-                item = await self.queue.get()
-                batch_data.append(item)
+                await self._not_empty.wait()
             except asyncio.CancelledError:
                 break
 
-            deadline = asyncio.get_running_loop().time() + EMBED_BATCH_TIMEOUT_S
-            while len(batch_data) < EMBED_MAX_BATCH_SIZE:
-                timeout = deadline - asyncio.get_running_loop().time()
+            batch_timeout = (
+                EMBED_BUSY_BATCH_TIMEOUT_S
+                if len(self.queue) > 1
+                else EMBED_BATCH_TIMEOUT_S
+            )
+            deadline = loop.time() + batch_timeout
+            while len(self.queue) < EMBED_MAX_BATCH_SIZE:
+                timeout = deadline - loop.time()
                 if timeout <= 0:
                     break
+                self._not_empty.clear()
                 try:
-                    item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
-                    batch_data.append(item)
+                    await asyncio.wait_for(self._not_empty.wait(), timeout=timeout)
                 except asyncio.TimeoutError:
                     break
                 except asyncio.CancelledError:
                     return
 
+            batch_data = drain_queue(
+                self.queue, self._not_empty, self._slots, EMBED_MAX_BATCH_SIZE
+            )
             if batch_data:
                 await self._run_batch(batch_data)
 
     async def _run_batch(
-        self, batch_data: List[Tuple[List[str], asyncio.Future]]
+        self, batch_data: List[Tuple[List[str], bool, List[asyncio.Future]]]
     ):
-        """Flatten batch, run inference, redistribute results."""
+        """Flatten and deduplicate batch, run inference, redistribute results."""
         all_texts = []
-        request_indices = []
-
-        start_idx = 0
-        for texts, _ in batch_data:
-            all_texts.extend(texts)
-            count = len(texts)
-            request_indices.append((start_idx, start_idx + count))
-            start_idx += count
+        is_query_mask = []
+        request_slots = []
+        # Texts repeated across (or within) queued requests run only once;
+        # the query flag is part of the key since it changes the embedding
+        unique_index: Dict[Tuple[bool, str], int] = {}
+
+        for texts, is_query, _ in batch_data:
+            slots = []
+            for text in texts:
+                slot = unique_index.get((is_query, text))
+                if slot is None:
+                    slot = len(all_texts)
+                    unique_index[(is_query, text)] = slot
+                    all_texts.append(text)
+                    is_query_mask.append(is_query)
+                slots.append(slot)
+            request_slots.append(slots)
 
         loop = asyncio.get_running_loop()
 
         try:
-            dense_all, sparse_all, latency = await loop.run_in_executor(
-                None, run_embed_inference_sync, all_texts
+            dense_all, sparse_all, _ = await loop.run_in_executor(
+                self.executor, run_embed_inference_sync, all_texts, is_query_mask
             )
 
-            for i, (_, future) in enumerate(batch_data):
-                start, end = request_indices[i]
-                response_obj = {
-                    "dense_vecs": dense_all[start:end],
-                    "sparse_vecs": sparse_all[start:end],
-                    "latency_ms": latency,
-                    "batch_size": len(all_texts),
-                }
-                if not future.done():
-                    future.set_result(response_obj)
+            for (_, _, futures), slots in zip(batch_data, request_slots):
+                for future, slot in zip(futures, slots):
+                    if not future.done():
+                        future.set_result((dense_all[slot], sparse_all[slot]))
 
         except Exception as e:
             print(f"❌ Embed Batch Error: {e}")
-            for _, future in batch_data:
-                if not future.done():
-                    future.set_exception(e)
+            # Release memory held by the failed batch (e.g. after an OOM)
+            gc.collect()
+            torch.cuda.empty_cache()
+            # The handler awaits texts in order, so the first future carries
+            # the error; the rest are cancelled rather than left unretrieved
+            for _, _, futures in batch_data:
+                for j, future in enumerate(futures):
+                    if future.done():
+                        continue
+                    if j == 0:
+                        future.set_exception(e)
+                    else:
+                        future.cancel()
+
+
+def allocate_embed_buffers(session: ort.InferenceSession) -> Dict[str, object]:
+    """
+    Pre-allocate CUDA buffers for IO Binding, sized for the largest device batch.
+
+    Buffers are flat so any (batch_size, seq_len) prefix can be bound without
+    reallocating. The token inputs get page-locked host staging buffers so the
+    H2D copy is a direct DMA instead of going through pageable memory. Called
+    once at startup.
+    """
+    max_tokens = EMBED_MAX_BATCH_SIZE * EMBED_MAX_SEQ_LENGTH
+    device = torch.device("cuda", EMBED_CUDA_PROVIDER_OPTIONS["device_id"])
+    sparse_rank = next(
+        len(o.shape) for o in session.get_outputs() if o.name == "sparse_vecs"
+    )
+
+    return {
+        "input_ids": torch.empty(max_tokens, dtype=torch.int64, device=device),
+        "attention_mask": torch.empty(max_tokens, dtype=torch.int64, device=device),
+        "input_ids_host": torch.empty(max_tokens, dtype=torch.int64).pin_memory(),
+        "attention_mask_host": torch.empty(
+            max_tokens, dtype=torch.int64
+        ).pin_memory(),
+        "dense_vecs": torch.empty(
+            EMBED_MAX_BATCH_SIZE * EMBED_DENSE_DIM, dtype=torch.float32, device=device
+        ),
+        "sparse_vecs": torch.empty(max_tokens, dtype=torch.float32, device=device),
+        "sparse_rank": sparse_rank,
+    }
+
+
+def _bind_embed_io(
+    io_binding: ort.IOBinding,
+    buffers: Dict[str, object],
+    input_ids: np.ndarray,
+    attention_mask: np.ndarray,
+) -> None:
+    """
+    Copy a tokenized batch into the CUDA buffers and bind them to the session.
+
+    Inputs are staged through the pinned host buffers. The device copy stays
+    blocking, since ORT runs on its own stream and must see finished inputs.
+    """
+    batch_size, seq_len = input_ids.shape
+    n_tokens = batch_size * seq_len
+    device_id = EMBED_CUDA_PROVIDER_OPTIONS["device_id"]
+
+    io_binding.clear_binding_inputs()
+    io_binding.clear_binding_outputs()
+
+    host_inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+    for name, host_array in host_inputs.items():
+        host_buffer = buffers[f"{name}_host"][:n_tokens]
+        np.copyto(host_buffer.numpy(), host_array.reshape(-1))
+        device_buffer = buffers[name][:n_tokens]
+        device_buffer.copy_(host_buffer)
+        io_binding.bind_input(
+            name=name,
+            device_type="cuda",
+            device_id=device_id,
+            element_type=np.int64,
+            shape=(batch_size, seq_len),
+            buffer_ptr=device_buffer.data_ptr(),
+        )
+
+    sparse_shape = (batch_size, seq_len) + (1,) * (buffers["sparse_rank"] - 2)
+    io_binding.bind_output(
+        name="dense_vecs",
+        device_type="cuda",
+        device_id=device_id,
+        element_type=np.float32,
+        shape=(batch_size, EMBED_DENSE_DIM),
+        buffer_ptr=buffers["dense_vecs"].data_ptr(),
+    )
+    io_binding.bind_output(
+        name="sparse_vecs",
+        device_type="cuda",
+        device_id=device_id,
+        element_type=np.float32,
+        shape=sparse_shape,
+        buffer_ptr=buffers["sparse_vecs"].data_ptr(),
+    )
+
+
+def build_special_token_mask(tokenizer) -> np.ndarray:
+    """Boolean lookup over the vocab that is True for every special token id."""
+    special_mask = np.zeros(len(tokenizer), dtype=bool)
+    special_mask[tokenizer.all_special_ids] = True
+    return special_mask
+
+
+def build_sparse_vecs(
+    raw_sparse: np.ndarray, input_ids: np.ndarray, special_mask: np.ndarray
+) -> List[Dict[int, float]]:
+    """
+    Collapse per-position sparse weights into token-id -> max-weight maps.
+
+    Special tokens (BOS, PAD, EOS, UNK, ...; see build_special_token_mask)
+    and non-positive weights are dropped. Duplicate token ids keep their
+    maximum weight.
+    """
+    mask = (raw_sparse > 0) & ~special_mask[input_ids]
+
+    sparse_vecs = []
+    for i in range(raw_sparse.shape[0]):
+        row_ids = input_ids[i][mask[i]]
+        if row_ids.size == 0:
+            sparse_vecs.append({})
+            continue
+        row_weights = raw_sparse[i][mask[i]]
+
+        order = np.argsort(row_ids, kind="stable")
+        unique_ids, first = np.unique(row_ids[order], return_index=True)
+        max_weights = np.maximum.reduceat(row_weights[order], first)
+        sparse_vecs.append(dict(zip(unique_ids.tolist(), max_weights.tolist())))
+
+    return sparse_vecs
+
+
+def bucket_by_length(lengths: List[int]) -> List[List[int]]:
+    """
+    Group text indices into device batches of similar token length.
+
+    Indices are visited in length order; a new bucket starts when the current
+    one is full or the next text is more than EMBED_BUCKET_MAX_RATIO times
+    longer than the bucket's shortest text. This keeps padding waste low when
+    short queries and long documents share a batch.
+    """
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    for idx in np.argsort(lengths, kind="stable").tolist():
+        if current and (
+            len(current) == EMBED_MAX_BATCH_SIZE
+            or lengths[idx] > EMBED_BUCKET_MAX_RATIO * lengths[current[0]]
+        ):
+            buckets.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def pick_graph_shape(batch_size: int, seq_len: int) -> Optional[int]:
+    """
+    Index of the smallest captured graph shape worth padding to, or None.
+
+    Shapes are ordered by size, so the first one that fits is the smallest.
+    None when no shape fits, or when the fitting shape would pad the batch
+    to more than EMBED_GRAPH_MAX_PAD_RATIO times its own tokens (and more
+    than EMBED_GRAPH_MIN_PAD_TOKENS); such a batch is cheaper run eagerly.
+    """
+    max_tokens = max(
+        EMBED_GRAPH_MAX_PAD_RATIO * batch_size * seq_len, EMBED_GRAPH_MIN_PAD_TOKENS
+    )
+    for graph_id, (graph_batch, graph_seq) in enumerate(
+        model_resources["embed_graph_shapes"]
+    ):
+        if graph_batch >= batch_size and graph_seq >= seq_len:
+            return graph_id if graph_batch * graph_seq <= max_tokens else None
+    return None
+
+
+def pad_token_ids(
+    token_ids: List[List[int]],
+    pad_token_id: int,
+    shape: Optional[Tuple[int, int]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Right-pad token id lists into input_ids and attention_mask arrays.
+
+    By default pads to the longest sequence; pass shape to pad rows and
+    columns up to a fixed (batch_size, seq_len).
+    """
+    if shape is None:
+        shape = (len(token_ids), max(len(ids) for ids in token_ids))
+    input_ids = np.full(shape, pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros(shape, dtype=np.int64)
+    for row, ids in enumerate(token_ids):
+        input_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+    return input_ids, attention_mask
+
+
+def _run_embed_session(
+    input_ids: np.ndarray,
+    attention_mask: np.ndarray,
+    graph_id: Optional[int],
+) -> float:
+    """Bind one padded batch, run it (replaying its CUDA graph if any), return ms."""
+    session = model_resources["embed_session"]
+    io_binding = model_resources["embed_io_binding"]
+    run_options = (
+        model_resources["embed_graph_run_options"][graph_id]
+        if graph_id is not None
+        else model_resources["embed_eager_run_options"]
+    )
+
+    t0 = time.perf_counter()
+    _bind_embed_io(io_binding, model_resources["embed_buffers"], input_ids, attention_mask)
+    session.run_with_iobinding(io_binding, run_options)
+    io_binding.synchronize_outputs()
+    return (time.perf_counter() - t0) * 1e3
 
 
 def run_embed_inference_sync(
     texts: List[str],
-) -> Tuple[List[List[float]], List[Dict[int, float]], float]:
+    is_query_mask: List[bool],
+) -> Tuple[List[str], List[Dict[int, float]], float]:
     """
     Synchronous embedding inference for thread pool execution.
 
-    Uses ONNX Runtime GPU provider for INT8 quantized model.
+    Uses ONNX Runtime GPU provider for INT8 quantized model, with IO Binding
+    onto pre-allocated CUDA buffers. Texts are tokenized once, then run in
+    length-bucketed device batches of at most EMBED_MAX_BATCH_SIZE; results
+    are returned in input order. Rows flagged in is_query_mask get the
+    pre-tokenized query prefix spliced in after BOS. Batches that fit a
+    captured shape without excessive padding are padded up to it and
+    replayed as a CUDA graph; the rest run at their own shape. Dense
+    vectors are returned as base64-encoded float16 bytes.
     """
     tokenizer = model_resources["embed_tokenizer"]
-    model = model_resources["embed_model"]
+    buffers = model_resources["embed_buffers"]
 
-    inputs = tokenizer(
+    # Only input_ids are needed; the attention mask is rebuilt when padding
+    encoded = tokenizer(
         texts,
-        padding=True,
         truncation=True,
-        max_length=512,
-        return_tensors="pt",  # PyTorch tensors required for ONNX IO Binding
-    )
+        max_length=EMBED_MAX_SEQ_LENGTH,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )["input_ids"]
+
+    # Splice the query prefix in as token ids: [BOS] + prefix + body + [EOS],
+    # truncating the body so the sequence still fits
+    prefix_ids = model_resources["query_prefix_ids"]
+    body_limit = EMBED_MAX_SEQ_LENGTH - len(prefix_ids) - 2
+    for i, is_query in enumerate(is_query_mask):
+        if is_query:
+            ids = encoded[i]
+            encoded[i] = ids[:1] + prefix_ids + ids[1:-1][:body_limit] + ids[-1:]
+
+    dense_vecs: List[str] = [None] * len(texts)
+    sparse_vecs: List[Dict[int, float]] = [None] * len(texts)
+    latency = 0.0
+
+    for bucket in bucket_by_length([len(ids) for ids in encoded]):
+        bucket_ids = [encoded[i] for i in bucket]
+        graph_id = pick_graph_shape(len(bucket), max(len(ids) for ids in bucket_ids))
+        input_ids, attention_mask = pad_token_ids(
+            bucket_ids,
+            tokenizer.pad_token_id,
+            model_resources["embed_graph_shapes"][graph_id]
+            if graph_id is not None
+            else None,
+        )
+        seq_len = input_ids.shape[1]
+        rows = len(bucket)
+
+        latency += _run_embed_session(input_ids, attention_mask, graph_id)
+
+        # Copy back only the real rows of this batch; cast on device so
+        # the D2H copy moves float16
+        dense = (
+            buffers["dense_vecs"][:rows * EMBED_DENSE_DIM]
+            .view(rows, EMBED_DENSE_DIM)
+            .to(torch.float16)
+            .cpu()
+            .numpy()
+        )
+        raw_sparse = (
+            buffers["sparse_vecs"][:rows * seq_len]
+            .view(rows, seq_len)
+            .cpu()
+            .numpy()
+        )
+        sparse = build_sparse_vecs(
+            raw_sparse, input_ids[:rows], model_resources["special_token_mask"]
+        )
 
-    t0 = time.perf_counter()
-    outputs = model(**inputs)
-    latency = (time.perf_counter() - t0) * 1e3
+        # Scatter back to input order
+        for row, idx in enumerate(bucket):
+            dense_vecs[idx] = base64.b64encode(dense[row].tobytes()).decode("ascii")
+            sparse_vecs[idx] = sparse[row]
+
+    return dense_vecs, sparse_vecs, latency
 
-    # Dense vectors
-    dense_vecs = outputs["dense_vecs"].tolist()
 
-    # Sparse vectors - remove special tokens
-    sparse_vecs = []
-    raw_sparse = outputs["sparse_vecs"]
-    input_ids = inputs["input_ids"]
-
-    for i, seq_weights in enumerate(raw_sparse):
-        current_input_ids = input_ids[i]
-        token_weight_map = {}
-        for idx, weight in enumerate(seq_weights):
-            if weight > 0:
-                token_id = int(current_input_ids[idx])
-                # Skip special tokens (BOS=0, PAD=1, EOS=2)
-                if token_id in [0, 1, 2]:
-                    continue
-                val = weight.item()
-                if token_id in token_weight_map:
-                    token_weight_map[token_id] = max(token_weight_map[token_id], val)
-                else:
-                    token_weight_map[token_id] = val
-        sparse_vecs.append(token_weight_map)
 
-    # Cleanup
-    del inputs
-    del outputs
-    del raw_sparse
-    del input_ids
-    gc.collect()
 
-    return dense_vecs, sparse_vecs, latency
+def warmup_embed_model() -> None:
+    """Run full-length forward passes at representative batch sizes."""
+    warmup_text = "warmup " * EMBED_MAX_SEQ_LENGTH
+    for batch_size in EMBED_WARMUP_BATCH_SIZES:
+        _, _, latency = run_embed_inference_sync(
+            [warmup_text] * batch_size, [False] * batch_size
+        )
+        print(f"   batch_size={batch_size}: {latency:.1f} ms")
+
+    # ORT captures a CUDA graph after a few regular runs per graph id, so
+    # replay each shape here rather than on the first live request
+    pad_token_id = model_resources["embed_tokenizer"].pad_token_id
+    for graph_id, shape in enumerate(model_resources["embed_graph_shapes"]):
+        input_ids = np.full(shape, pad_token_id, dtype=np.int64)
+        attention_mask = np.ones(shape, dtype=np.int64)
+        for _ in range(EMBED_GRAPH_WARMUP_RUNS):
+            latency = _run_embed_session(input_ids, attention_mask, graph_id)
+        print(f"   cuda_graph shape={shape}: {latency:.1f} ms")
 
 
 
@@ -222,11 +636,15 @@ class RerankBatcher:
     """Async batching for reranking requests."""
 
     def __init__(self):
-        self.queue: asyncio.Queue = asyncio.Queue(maxsize=RERANK_MAX_QUEUE_SIZE)
+        self.queue: deque = deque()
+        self._not_empty = asyncio.Event()
+        self._slots = asyncio.Semaphore(RERANK_MAX_QUEUE_SIZE)
         self.processing_loop_task = None
+        self.executor = None
 
     async def start(self):
         """Start the background processing loop."""
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
         self.processing_loop_task = asyncio.create_task(self._process_loop())
         print("✅ Rerank batch processor started.")
 
@@ -238,98 +656,241 @@ class RerankBatcher:
                 await self.processing_loop_task
             except asyncio.CancelledError:
                 pass
+        if self.executor:
+            self.executor.shutdown(wait=True)
 
-    async def process(self, query: str, documents: List[str]) -> dict:
-        """Process a reranking request."""
+    async def process(self, query: str, documents: List[str], top_k: int) -> dict:
+        """Process a reranking request, returning the top_k results sorted by score."""
         loop = asyncio.get_running_loop()
         future = loop.create_future()
-        await self.queue.put((query, documents, future))
+        await self._slots.acquire()
+        self.queue.append((query, documents, top_k, future))
+        self._not_empty.set()
         return await future
 
     async def _process_loop(self):
         """Background loop that collects and processes batches."""
+        loop = asyncio.get_running_loop()
         while True:
-            batch_data = []
-
             try:
-                item = await self.queue.get()
-                batch_data.append(item)
+                await self._not_empty.wait()
             except asyncio.CancelledError:
                 break
 
-            deadline = asyncio.get_running_loop().time() + RERANK_BATCH_TIMEOUT_S
-            while len(batch_data) < RERANK_MAX_BATCH_SIZE:
-                timeout = deadline - asyncio.get_running_loop().time()
+            deadline = loop.time() + RERANK_BATCH_TIMEOUT_S
+            while len(self.queue) < RERANK_MAX_BATCH_SIZE:
+                timeout = deadline - loop.time()
                 if timeout <= 0:
                     break
+                self._not_empty.clear()
                 try:
-                    item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
-                    batch_data.append(item)
+                    await asyncio.wait_for(self._not_empty.wait(), timeout=timeout)
                 except asyncio.TimeoutError:
                     break
                 except asyncio.CancelledError:
                     return
 
+            batch_data = drain_queue(
+                self.queue, self._not_empty, self._slots, RERANK_MAX_BATCH_SIZE
+            )
             if batch_data:
                 await self._run_batch(batch_data)
 
     async def _run_batch(self, batch_data: List[tuple]):
         """Process a batch of reranking requests."""
-        all_pairs = []
+        total = sum(len(docs) for _, docs, _, _ in batch_data)
+        all_pairs: List[Tuple[str, str]] = [None] * total
         request_boundaries = []
 
         start_idx = 0
-        for query, docs, _ in batch_data:
-            pairs = [[query, doc] for doc in docs]
-            all_pairs.extend(pairs)
+        for query, docs, _, _ in batch_data:
+            i = start_idx
+            for doc in docs:
+                all_pairs[i] = (query, doc)
+                i += 1
             request_boundaries.append({
                 "start": start_idx,
-                "end": start_idx + len(pairs),
+                "end": i,
                 "doc_count": len(docs),
             })
-            start_idx += len(pairs)
+            start_idx = i
 
         loop = asyncio.get_running_loop()
 
         try:
             t0 = time.perf_counter()
 
-            reranker = model_resources["reranker"]
             scores = await loop.run_in_executor(
-                None, lambda: reranker.compute_score(all_pairs)
+                self.executor, run_rerank_inference_sync, all_pairs
             )
 
             latency_ms = (time.perf_counter() - t0) * 1000
+            scores = np.asarray(scores, dtype=np.float32)
 
-            if not isinstance(scores, list):
-                scores = [scores]
-
-            for i, (query, docs, future) in enumerate(batch_data):
+            for i, (query, docs, top_k, future) in enumerate(batch_data):
                 bounds = request_boundaries[i]
                 doc_scores = scores[bounds["start"]:bounds["end"]]
-
-                indexed_scores = list(enumerate(doc_scores))
-                indexed_scores.sort(key=lambda x: x[1], reverse=True)
+                order = top_k_order(doc_scores, top_k)
 
                 if not future.done():
                     future.set_result({
-                        "results": indexed_scores,
+                        "results": (order.tolist(), doc_scores[order].tolist()),
                         "latency_ms": latency_ms,
                         "batch_size": len(all_pairs),
                     })
 
         except Exception as e:
             print(f"❌ Rerank batch error: {e}")
-            for _, _, future in batch_data:
+            for *_, future in batch_data:
                 if not future.done():
                     future.set_exception(e)
 
 
 
 
+def top_k_order(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, sorted by descending score.
+
+    argpartition selects the top_k in O(N) so only those k get sorted.
+    """
+    k = min(max(top_k, 0), len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def load_fast_tokenizer(model_id: str):
+    """Load the Rust-backed tokenizer, refusing the slow Python fallback."""
+    tokenizer = AutoTokenizer.from_pretrained(
+        model_id,
+        use_fast=True,
+        cache_dir=str(MODELS_CACHE_DIR)
+    )
+    if not tokenizer.is_fast:
+        raise RuntimeError(f"No fast tokenizer available for {model_id}")
+    return tokenizer
+
+
+def export_rerank_fp16_model(model_dir: Path) -> None:
+    """
+    Export the HuggingFace reranker to FP16 ONNX under model_dir.
+
+    The FP32 export is kept, so a later FP16 conversion can start from it
+    instead of exporting again.
+    """
+    if (model_dir / RERANK_ONNX_EXPORT_FILE_NAME).exists():
+        model = ORTModelForSequenceClassification.from_pretrained(
+            model_dir, file_name=RERANK_ONNX_EXPORT_FILE_NAME
+        )
+    else:
+        model = ORTModelForSequenceClassification.from_pretrained(
+            RERANK_MODEL_ID, export=True, cache_dir=str(MODELS_CACHE_DIR)
+        )
+        model.save_pretrained(model_dir)
+
+    # fp16 conversion needs the GPU-targeted transformer fusions
+    ORTOptimizer.from_pretrained(model).optimize(
+        optimization_config=OptimizationConfig(
+            optimization_level=2, optimize_for_gpu=True, fp16=True
+        ),
+        save_dir=model_dir,
+        file_suffix=RERANK_ONNX_FP16_SUFFIX,
+    )
+
+
+def onnx_model_precision(model_path: Path) -> str:
+    """
+    Precision of an ONNX model file, read from its graph.
+
+    Q/DQ nodes mean INT8; otherwise FP16 weights mean FP16. Only the graph
+    is parsed, external weight data is not loaded.
+    """
+    graph = onnx.load(str(model_path), load_external_data=False).graph
+    if any(node.op_type == "QuantizeLinear" for node in graph.node):
+        return "int8"
+    if any(init.data_type == onnx.TensorProto.FLOAT16 for init in graph.initializer):
+        return "fp16"
+    return "fp32"
+
+
+def load_rerank_model() -> ORTModelForSequenceClassification:
+    """
+    Load the reranker as an ONNX Runtime model on the CUDA provider.
+
+    Uses RERANK_ONNX_MODEL_PATH when set; otherwise exports the HuggingFace
+    model to FP16 ONNX on first start and reuses the cached export afterwards.
+    Records the loaded model's precision in model_resources.
+    """
+    if RERANK_ONNX_MODEL_PATH:
+        model_dir = Path(RERANK_ONNX_MODEL_PATH)
+    else:
+        model_dir = RERANK_ONNX_EXPORT_DIR
+        if not (model_dir / RERANK_ONNX_FILE_NAME).exists():
+            export_rerank_fp16_model(model_dir)
+
+    model = ORTModelForSequenceClassification.from_pretrained(
+        model_dir,
+        file_name=RERANK_ONNX_FILE_NAME,
+        provider="CUDAExecutionProvider",
+    )
+    model_resources["rerank_precision"] = onnx_model_precision(
+        model_dir / RERANK_ONNX_FILE_NAME
+    )
+    return model
+
+
+def run_rerank_inference_sync(pairs: List[Tuple[str, str]]) -> List[float]:
+    """
+    Synchronous reranking inference for thread pool execution.
+
+    Scores (query, document) pairs in chunks of RERANK_INFERENCE_BATCH_SIZE
+    and returns sigmoid relevance scores in input order.
+    """
+    tokenizer = model_resources["rerank_tokenizer"]
+    model = model_resources["reranker"]
+
+    scores: List[float] = []
+    for offset in range(0, len(pairs), RERANK_INFERENCE_BATCH_SIZE):
+        chunk = pairs[offset:offset + RERANK_INFERENCE_BATCH_SIZE]
+        inputs = tokenizer(
+            [query for query, _ in chunk],
+            [doc for _, doc in chunk],
+            padding=True,
+            truncation=True,
+            max_length=RERANK_MAX_SEQ_LENGTH,
+            return_token_type_ids=False,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            logits = model(**inputs).logits
+        scores.extend(torch.sigmoid(logits.float()).squeeze(-1).cpu().tolist())
+
+    return scores
+
+
+def warmup_rerank_model() -> None:
+    """Run a full-length rerank batch so the first query skips CUDA setup."""
+    warmup_text = "warmup " * RERANK_MAX_SEQ_LENGTH
+    pairs = [(warmup_text, warmup_text)] * RERANK_INFERENCE_BATCH_SIZE
+    t0 = time.perf_counter()
+    run_rerank_inference_sync(pairs)
+    latency = (time.perf_counter() - t0) * 1000
+    print(f"   batch_size={RERANK_INFERENCE_BATCH_SIZE}: {latency:.1f} ms")
+
+
+
+
 embed_batcher = EmbedBatcher()
 rerank_batcher = RerankBatcher()
 
+# (is_query, text) -> (base64 float16 dense vector, sparse dict)
+embed_cache: LRUCache = LRUCache(maxsize=EMBED_CACHE_SIZE)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -340,32 +901,81 @@ async def lifespan(app: FastAPI):
 
     # Load Embedding Model (ONNX INT8 on GPU)
     print("\n📦 Loading BGE-M3 Embedding Model (ONNX INT8, GPU)...")
-    model_resources["embed_tokenizer"] = AutoTokenizer.from_pretrained(
-        EMBED_MODEL_ID,
-        cache_dir=str(MODELS_CACHE_DIR)
+    model_resources["embed_tokenizer"] = load_fast_tokenizer(EMBED_MODEL_ID)
+    # Tokenized once so queries don't re-tokenize the prefix on every call.
+    # Stripped: SentencePiece marks the following word's leading space itself.
+    model_resources["query_prefix_ids"] = model_resources["embed_tokenizer"](
+        QUERY_PREFIX.strip(), add_special_tokens=False
+    )["input_ids"]
+    model_resources["special_token_mask"] = build_special_token_mask(
+        model_resources["embed_tokenizer"]
     )
 
-    # Use ONNX Runtime with CUDA Execution Provider
-    # use_io_binding=False: Required because this model has dynamic axes
-    # that IO Binding cannot handle (causes "invalid literal for int()" error)
-    model_resources["embed_model"] = ORTModelForCustomTasks.from_pretrained(
+    # Raw ONNX Runtime session so inputs/outputs can be IO-bound to
+    # pre-allocated CUDA buffers (no per-call allocations or host copies)
+    embed_model_path = EMBED_ONNX_MODEL_PATH or hf_hub_download(
         EMBED_ONNX_MODEL_ID,
-        file_name="model_quantized.onnx",
+        filename=EMBED_ONNX_FILE_NAME,
         cache_dir=str(MODELS_CACHE_DIR),
-        provider="CUDAExecutionProvider",
-        use_io_binding=False,
     )
-    print(f"✅ Embedding model loaded: {EMBED_ONNX_MODEL_ID}")
-
-    # Load Reranker Model (FP16 on GPU)
-    print("\n📦 Loading BGE-Reranker Model (FP16, GPU)...")
-    model_resources["reranker"] = FlagReranker(
-        RERANK_MODEL_ID,
-        use_fp16=True,
-        device="cuda",
-        cache_dir=str(MODELS_CACHE_DIR)
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = (
+        ort.GraphOptimizationLevel.ORT_ENABLE_ALL
     )
-    print(f"✅ Reranker model loaded: {RERANK_MODEL_ID}")
+    embed_session = None
+    if EMBED_CUDA_GRAPH:
+        # CUDA graphs need every node on the CUDA EP; fall back if they aren't
+        try:
+            embed_session = ort.InferenceSession(
+                embed_model_path,
+                sess_options=session_options,
+                providers=[(
+                    "CUDAExecutionProvider",
+                    {**EMBED_CUDA_PROVIDER_OPTIONS, "enable_cuda_graph": "1"},
+                )],
+            )
+        except Exception as e:
+            print(f"⚠️ CUDA graphs unavailable, running without them: {e}")
+    if embed_session is not None:
+        model_resources["embed_graph_shapes"] = EMBED_GRAPH_SHAPES
+        model_resources["embed_graph_run_options"] = []
+        for graph_id in range(len(EMBED_GRAPH_SHAPES)):
+            run_options = ort.RunOptions()
+            run_options.add_run_config_entry("gpu_graph_id", str(graph_id))
+            model_resources["embed_graph_run_options"].append(run_options)
+        # Graph id -1 runs without capturing or replaying a graph
+        eager_run_options = ort.RunOptions()
+        eager_run_options.add_run_config_entry("gpu_graph_id", "-1")
+        model_resources["embed_eager_run_options"] = eager_run_options
+    else:
+        embed_session = ort.InferenceSession(
+            embed_model_path,
+            sess_options=session_options,
+            providers=[
+                ("CUDAExecutionProvider", EMBED_CUDA_PROVIDER_OPTIONS),
+                "CPUExecutionProvider",
+            ],
+        )
+    model_resources["embed_session"] = embed_session
+    model_resources["embed_io_binding"] = embed_session.io_binding()
+    model_resources["embed_buffers"] = allocate_embed_buffers(embed_session)
+    print(f"✅ Embedding model loaded: {embed_model_path}")
+    print(f"   Execution providers: {embed_session.get_providers()}")
+    print(f"   CUDA graph shapes: {model_resources['embed_graph_shapes']}")
+
+    # Grow the CUDA arena and cache cuDNN algorithms before serving traffic
+    print("🔥 Warming up embedding model...")
+    warmup_embed_model()
+
+    # Load Reranker Model (ONNX on GPU)
+    print("\n📦 Loading BGE-Reranker Model (ONNX, GPU)...")
+    model_resources["rerank_tokenizer"] = load_fast_tokenizer(RERANK_MODEL_ID)
+    model_resources["reranker"] = load_rerank_model()
+    print(f"✅ Reranker model loaded: {RERANK_ONNX_MODEL_PATH or RERANK_MODEL_ID}")
+    print(f"   Precision: {model_resources['rerank_precision']}")
+
+    print("🔥 Warming up reranker model...")
+    warmup_rerank_model()
 
     # Start batchers
     print("\n🔄 Starting batch processors...")
@@ -401,14 +1011,6 @@ class EmbeddingRequest(BaseModel):
     is_query: bool = False
 
 
-class EmbeddingResponse(BaseModel):
-    """Embedding response model."""
-    dense_vecs: List[List[float]]
-    sparse_vecs: List[Dict[int, float]]
-    latency_ms: float
-    batch_size: int
-
-
 class RerankRequest(BaseModel):
     """Reranking request model."""
     query: str
@@ -432,16 +1034,51 @@ class RerankResponse(BaseModel):
 
 
 
-@app.post("/embed", response_model=EmbeddingResponse)
-async def create_embeddings(request: EmbeddingRequest):
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+async def parse_embedding_request(request: Request) -> EmbeddingRequest:
+    """Parse an /embed body sent as either JSON or MessagePack."""
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+            return EmbeddingRequest.model_validate(msgpack.unpackb(body))
+        return EmbeddingRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors()) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}") from e
+
+
+_EMBED_REQUEST_SCHEMA = {"schema": EmbeddingRequest.model_json_schema()}
+
+
+@app.post(
+    "/embed",
+    response_class=StreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": _EMBED_REQUEST_SCHEMA,
+                MSGPACK_MEDIA_TYPE: _EMBED_REQUEST_SCHEMA,
+            },
+        }
+    },
+)
+async def create_embeddings(
+    request: EmbeddingRequest = Depends(parse_embedding_request),
+):
     """
     Generate embeddings for text(s).
 
     Args:
-        request: EmbeddingRequest with text and optional is_query flag
+        request: EmbeddingRequest with text and optional is_query flag, as a
+            JSON or MessagePack (Content-Type: application/msgpack) body
 
     Returns:
-        EmbeddingResponse with dense and sparse vectors
+        NDJSON stream with one {"dense": ..., "sparse": ...} line per text, in
+        input order; dense is base64-encoded little-endian float16
     """
     input_texts = [request.text] if isinstance(request.text, str) else request.text
 
@@ -454,20 +1091,42 @@ async def create_embeddings(request: EmbeddingRequest):
             detail=f"Too many texts. Max: {EMBED_MAX_TEXTS_PER_REQUEST}, got: {len(input_texts)}",
         )
 
-    if request.is_query:
-        input_texts = [QUERY_PREFIX + t for t in input_texts]
-
-    result = await embed_batcher.process(input_texts)
-
-    return EmbeddingResponse(
-        dense_vecs=result["dense_vecs"],
-        sparse_vecs=result["sparse_vecs"],
-        latency_ms=result["latency_ms"],
-        batch_size=result["batch_size"],
-    )
-
-
-@app.post("/rerank", response_model=RerankResponse)
+    # Serve repeated texts from the cache; only misses go to the GPU.
+    # Cache reads and writes never straddle an await, so no lock is needed.
+    rows: List[object] = [None] * len(input_texts)
+    miss_indices = []
+    for i, text in enumerate(input_texts):
+        cached = embed_cache.get((request.is_query, text))
+        if cached is None:
+            miss_indices.append(i)
+            continue
+        rows[i] = cached
+
+    if miss_indices:
+        miss_texts = [input_texts[i] for i in miss_indices]
+        futures = await embed_batcher.process(miss_texts, is_query=request.is_query)
+        for i, future in zip(miss_indices, futures):
+            rows[i] = future
+        # Surface batch failures as an error status before the stream starts
+        await futures[0]
+
+    async def stream_rows():
+        for text, row in zip(input_texts, rows):
+            if isinstance(row, asyncio.Future):
+                row = await row
+                embed_cache[(request.is_query, text)] = row
+            dense, sparse = row
+            yield orjson.dumps(
+                {"dense": dense, "sparse": sparse},
+                option=orjson.OPT_NON_STR_KEYS,
+            ) + b"\n"
+
+    return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+
+
+@app.post(
+    "/rerank", response_model=RerankResponse, response_class=ORJSONResponse
+)
 async def rerank(request: RerankRequest):
     """
     Rerank documents for a query.
@@ -476,7 +1135,8 @@ async def rerank(request: RerankRequest):
         request: RerankRequest with query, documents, and top_k
 
     Returns:
-        RerankResponse with ranked results
+        RerankResponse-shaped JSON with ranked results, serialized with
+        orjson directly
     """
     if not request.documents:
         raise HTTPException(400, "Documents list cannot be empty")
@@ -484,29 +1144,26 @@ async def rerank(request: RerankRequest):
     if len(request.documents) > 100:
         raise HTTPException(400, "Maximum 100 documents per request")
 
-    result = await rerank_batcher.process(request.query, request.documents)
+    result = await rerank_batcher.process(
+        request.query, request.documents, request.top_k
+    )
 
-    top_results = []
-    for idx, score in result["results"][:request.top_k]:
-        top_results.append(
-            RerankResult(
-                index=idx,
-                score=score,
-                document=request.documents[idx],
-            )
-        )
+    top_results = [
+        {"index": idx, "score": score, "document": request.documents[idx]}
+        for idx, score in zip(*result["results"])
+    ]
 
-    return RerankResponse(
-        results=top_results,
-        latency_ms=result["latency_ms"],
-        batch_size=result["batch_size"],
-    )
+    return ORJSONResponse(content={
+        "results": top_results,
+        "latency_ms": result["latency_ms"],
+        "batch_size": result["batch_size"],
+    })
 
 
 @app.get("/health")
 async def health():
     """Combined health check for both models."""
-    embed_ready = model_resources.get("embed_model") is not None
+    embed_ready = model_resources.get("embed_session") is not None
     rerank_ready = model_resources.get("reranker") is not None
 
     if not embed_ready or not rerank_ready:
@@ -516,15 +1173,15 @@ async def health():
         "status": "healthy",
         "models": {
             "embedding": {
-                "model": EMBED_ONNX_MODEL_ID,
+                "model": EMBED_ONNX_MODEL_PATH or EMBED_ONNX_MODEL_ID,
                 "device": "cuda",
                 "precision": "int8",
                 "ready": embed_ready,
             },
             "reranker": {
-                "model": RERANK_MODEL_ID,
+                "model": RERANK_ONNX_MODEL_PATH or RERANK_MODEL_ID,
                 "device": "cuda",
-                "precision": "fp16",
+                "precision": model_resources["rerank_precision"],
                 "ready": rerank_ready,
             },
         },
@@ -534,4 +1191,6 @@ async def health():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    # Outlive the bot's 60 s client keep-alive so the server never closes a
+    # connection the client is about to reuse
+    uvicorn.run(app, host="0.0.0.0", port=8001, timeout_keep_alive=75)
@@ -0,0 +1,128 @@
+"""
+Static QDQ INT8 quantization for the BGE-M3 and BGE-Reranker ONNX models.
+
+Dynamic quantization keeps activations in FP32, so on GPU the MatMuls still
+run FP32 kernels. Static QDQ quantization calibrates activation ranges
+offline, which lets the CUDA EP run MatMul/Gemm on INT8 Tensor Cores (and the
+CPU EP use VNNI). LayerNorm and Softmax are left in floating point.
+
+Usage:
+    # Embedding model: one sentence per line in the calibration file
+    python quantize_models.py embed \\
+        --model-path bge-m3/model.onnx \\
+        --calibration-file calibration.txt \\
+        --output-path bge-m3-qdq-int8.onnx
+
+    # Reranker: export first, then one "query<TAB>document" pair per line
+    optimum-cli export onnx --model BAAI/bge-reranker-base \\
+        --task text-classification bge-reranker-onnx/
+    python quantize_models.py rerank \\
+        --model-path bge-reranker-onnx/model.onnx \\
+        --calibration-file calibration_pairs.tsv \\
+        --output-path bge-reranker-onnx/model_quantized.onnx
+
+Use ~256 representative calibration lines. Point EMBED_ONNX_MODEL_PATH at
+the embedding output, and RERANK_ONNX_MODEL_PATH at the reranker export dir.
+"""
+import argparse
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import onnx
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from transformers import AutoTokenizer
+
+TOKENIZER_IDS = {
+    "embed": "BAAI/bge-m3",
+    "rerank": "BAAI/bge-reranker-base",
+}
+CALIBRATION_BATCH_SIZE = 8
+CALIBRATION_MAX_LENGTH = 512
+
+
+class TokenizedCalibrationReader(CalibrationDataReader):
+    """Feeds tokenized calibration texts (or text pairs) to the quantizer."""
+
+    def __init__(self, lines: List[str], tokenizer_name: str, pairs: bool):
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        self._batches = []
+        for i in range(0, len(lines), CALIBRATION_BATCH_SIZE):
+            chunk = lines[i:i + CALIBRATION_BATCH_SIZE]
+            if pairs:
+                split = [line.split("\t", 1) for line in chunk]
+                texts = ([q for q, _ in split], [d for _, d in split])
+            else:
+                texts = (chunk,)
+            inputs = tokenizer(
+                *texts,
+                padding=True,
+                truncation=True,
+                max_length=CALIBRATION_MAX_LENGTH,
+                return_tensors="np",
+            )
+            self._batches.append({
+                name: array.astype(np.int64) for name, array in inputs.items()
+            })
+        self._iterator: Iterator[Dict[str, np.ndarray]] = iter(self._batches)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        """Return the next calibration batch, or None when exhausted."""
+        return next(self._iterator, None)
+
+    def rewind(self) -> None:
+        """Restart iteration from the first batch."""
+        self._iterator = iter(self._batches)
+
+
+def quantize(
+    model: str, model_path: Path, calibration_file: Path, output_path: Path
+) -> None:
+    """Quantize MatMul/Gemm nodes to static QDQ INT8 and report the result."""
+    lines = [
+        line.strip()
+        for line in calibration_file.read_text(encoding="utf-8").splitlines()
+        if line.strip()
+    ]
+    print(f"📦 Calibrating {model} model with {len(lines)} samples...")
+
+    quantize_static(
+        model_input=str(model_path),
+        model_output=str(output_path),
+        calibration_data_reader=TokenizedCalibrationReader(
+            lines, TOKENIZER_IDS[model], pairs=model == "rerank"
+        ),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QInt8,
+        weight_type=QuantType.QInt8,
+        op_types_to_quantize=["MatMul", "Gemm"],
+        per_channel=True,
+        use_external_data_format=model_path.stat().st_size > 2 * 1024**3,
+    )
+
+    op_counts = Counter(
+        node.op_type for node in onnx.load(str(output_path)).graph.node
+    )
+    print(f"✅ Quantized model written to: {output_path}")
+    print(
+        f"   QuantizeLinear: {op_counts['QuantizeLinear']}, "
+        f"DequantizeLinear: {op_counts['DequantizeLinear']}, "
+        f"MatMul: {op_counts['MatMul']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("model", choices=sorted(TOKENIZER_IDS))
+    parser.add_argument("--model-path", type=Path, required=True)
+    parser.add_argument("--calibration-file", type=Path, required=True)
+    parser.add_argument("--output-path", type=Path, required=True)
+    args = parser.parse_args()
+
+    quantize(args.model, args.model_path, args.calibration_file, args.output_path)
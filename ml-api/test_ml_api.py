@@ -3,6 +3,11 @@ Tests for the unified ML API.
 
 Run with: pytest test_ml_api.py -v
 """
+import base64
+import json
+
+import msgpack
+import numpy as np
 import pytest
 import httpx
 from typing import Any
@@ -17,6 +22,11 @@ def api_url() -> str:
     return ML_API_URL
 
 
+def parse_ndjson(response: httpx.Response) -> list[dict[str, Any]]:
+    """Parse an NDJSON /embed response into one dict per text."""
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
 class TestHealthEndpoint:
     """Tests for the /health endpoint."""
 
@@ -61,11 +71,14 @@ class TestEmbedEndpoint:
                     json={"text": "Hello, world!", "is_query": False},
                 )
                 assert response.status_code == 200
-                data = response.json()
-                assert "dense_vecs" in data
-                assert "sparse_vecs" in data
-                assert len(data["dense_vecs"]) == 1
-                assert len(data["dense_vecs"][0]) == 1024  # BGE-M3 dimension
+                rows = parse_ndjson(response)
+                assert len(rows) == 1
+                assert "dense" in rows[0]
+                assert "sparse" in rows[0]
+                dense = np.frombuffer(
+                    base64.b64decode(rows[0]["dense"]), dtype=np.float16
+                )
+                assert len(dense) == 1024  # BGE-M3 dimension
             except httpx.ConnectError:
                 pytest.skip("ML API not running on localhost:8001")
 
@@ -80,9 +93,25 @@ class TestEmbedEndpoint:
                     json={"text": texts, "is_query": False},
                 )
                 assert response.status_code == 200
-                data = response.json()
-                assert len(data["dense_vecs"]) == 3
-                assert len(data["sparse_vecs"]) == 3
+                rows = parse_ndjson(response)
+                assert len(rows) == 3
+                assert all("sparse" in row for row in rows)
+            except httpx.ConnectError:
+                pytest.skip("ML API not running on localhost:8001")
+
+    @pytest.mark.asyncio
+    async def test_embed_accepts_msgpack_body(self, api_url: str):
+        """Test that a MessagePack request body is accepted like JSON."""
+        async with httpx.AsyncClient() as client:
+            try:
+                texts = ["First text", "Second text"]
+                response = await client.post(
+                    f"{api_url}/embed",
+                    content=msgpack.packb({"text": texts, "is_query": False}),
+                    headers={"Content-Type": "application/msgpack"},
+                )
+                assert response.status_code == 200
+                assert len(parse_ndjson(response)) == 2
             except httpx.ConnectError:
                 pytest.skip("ML API not running on localhost:8001")
 
@@ -96,8 +125,8 @@ class TestEmbedEndpoint:
                     json={"text": "What is machine learning?", "is_query": True},
                 )
                 assert response.status_code == 200
-                data = response.json()
-                assert len(data["dense_vecs"]) == 1
+                rows = parse_ndjson(response)
+                assert len(rows) == 1
             except httpx.ConnectError:
                 pytest.skip("ML API not running on localhost:8001")
 
@@ -217,5 +246,56 @@ class TestRerankEndpoint:
                 pytest.skip("ML API not running on localhost:8001")
 
 
+@pytest.fixture
+def ml_api_module(monkeypatch: pytest.MonkeyPatch) -> Any:
+    """Import ml_api (needs the GPU stack) with the default graph shapes set."""
+    ml_api = pytest.importorskip("ml_api")
+    monkeypatch.setitem(
+        ml_api.model_resources, "embed_graph_shapes", ml_api.EMBED_GRAPH_SHAPES
+    )
+    return ml_api
+
+
+class TestGraphShapeSelection:
+    """Unit tests for CUDA graph shape selection; no running API needed."""
+
+    def test_single_query_uses_smallest_graph(self, ml_api_module):
+        """Test that a short single query replays the (1, 64) graph."""
+        graph_id = ml_api_module.pick_graph_shape(1, 20)
+        assert ml_api_module.EMBED_GRAPH_SHAPES[graph_id] == (1, 64)
+
+    def test_dense_batch_uses_fitting_graph(self, ml_api_module):
+        """Test that a batch close to a captured shape replays that graph."""
+        graph_id = ml_api_module.pick_graph_shape(30, 120)
+        assert ml_api_module.EMBED_GRAPH_SHAPES[graph_id] == (32, 128)
+
+    def test_sparse_batch_runs_without_graph(self, ml_api_module):
+        """Test that 9 short queries are not padded up to a large graph."""
+        assert ml_api_module.pick_graph_shape(9, 20) is None
+
+    def test_oversized_batch_runs_without_graph(self, ml_api_module):
+        """Test that a single max-length text is not padded to the full batch."""
+        seq_len = ml_api_module.EMBED_MAX_SEQ_LENGTH
+        assert ml_api_module.pick_graph_shape(1, seq_len) is None
+
+    def test_shapes_fit_small_max_batch_size(self, ml_api_module):
+        """Test that no shape outgrows buffers sized for EMBED_MAX_BATCH_SIZE=8."""
+        max_seq = ml_api_module.EMBED_MAX_SEQ_LENGTH
+        shapes = ml_api_module.build_graph_shapes(8, max_seq)
+        assert (8, max_seq) in shapes
+        assert (16, 128) not in shapes
+        assert (32, 256) not in shapes
+        for batch_size, seq_len in shapes:
+            assert batch_size <= 8
+            assert batch_size * seq_len <= 8 * max_seq
+
+    def test_no_graphs_captured(self, ml_api_module, monkeypatch):
+        """Test that no shape is picked when CUDA graphs are disabled."""
+        monkeypatch.setitem(
+            ml_api_module.model_resources, "embed_graph_shapes", []
+        )
+        assert ml_api_module.pick_graph_shape(1, 20) is None
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
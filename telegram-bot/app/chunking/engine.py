@@ -2,14 +2,87 @@
 
 import hashlib
 import re
-import uuid
 from dataclasses import dataclass
+from functools import lru_cache
 
 import nltk
-from transformers import AutoTokenizer
+from blingfire import text_to_sentences_and_offsets
+from transformers import AutoTokenizer, PreTrainedTokenizerFast
 
+from ..config import settings
 
-@dataclass
+_HEADER_RE = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
+
+
+def _content_id(key: str) -> str:
+    """
+    Derive a deterministic UUID-formatted id from a key string.
+
+    Uses a 16-byte BLAKE2b digest, formatted directly as a UUID string
+    rather than parsed through uuid.UUID.
+
+    Args:
+        key: String identifying the chunk
+
+    Returns:
+        UUID-formatted hex id
+    """
+    h = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+@lru_cache(maxsize=4)
+def _get_tokenizer(tokenizer_name: str) -> PreTrainedTokenizerFast:
+    """
+    Load a tokenizer once per process and share it across engines.
+
+    Args:
+        tokenizer_name: HuggingFace tokenizer to load
+
+    Returns:
+        Loaded Rust-backed tokenizer
+
+    Raises:
+        RuntimeError: If only the slow Python tokenizer is available
+    """
+    tokenizer = AutoTokenizer.from_pretrained(
+        tokenizer_name, use_fast=True, cache_dir=settings.hf_home
+    )
+    if not isinstance(tokenizer, PreTrainedTokenizerFast):
+        raise RuntimeError(f"No fast tokenizer available for {tokenizer_name}")
+    return tokenizer
+
+
+@lru_cache(maxsize=1)
+def _ensure_punkt() -> None:
+    """Download the NLTK punkt sentence model if it is missing (checked once)."""
+    try:
+        nltk.data.find("tokenizers/punkt_tab")
+    except LookupError:
+        nltk.download("punkt_tab", quiet=True)
+
+
+def _split_sentences(text: str) -> list[str]:
+    """
+    Split text into sentences, sliced from the original string.
+
+    Uses Bling Fire's compiled sentence breaker and only falls back to the
+    slower NLTK punkt model when it finds no boundary at all.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        List of sentences
+    """
+    _, offsets = text_to_sentences_and_offsets(text)
+    if len(offsets) <= 1:
+        sentences: list[str] = nltk.sent_tokenize(text)
+        return sentences
+    return [text[start:end] for start, end in offsets]
+
+
+@dataclass(slots=True)
 class ParentChunk:
     """Parent chunk containing full section context."""
 
@@ -21,7 +94,7 @@ class ParentChunk:
     child_ids: list[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class ChildChunk:
     """Child chunk for retrieval with overlap."""
 
@@ -67,14 +140,9 @@ class ChunkingEngine:
         self.parent_min_tokens = parent_min_tokens
         self.child_tokens = child_tokens
         self.child_overlap = child_overlap
-        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        self.tokenizer = _get_tokenizer(tokenizer_name)
 
-        self.header_pattern = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
-
-        try:
-            nltk.data.find("tokenizers/punkt_tab")
-        except LookupError:
-            nltk.download("punkt_tab", quiet=True)
+        _ensure_punkt()
 
     def chunk_document(
         self, markdown_content: str, file_hash: str, file_name: str
@@ -111,8 +179,10 @@ class ChunkingEngine:
         """
         sections = []
         current_headers = ["", "", ""]
+        # Joined once per distinct (h1, h2, h3) context, not once per section
+        path_cache: dict[tuple[str, ...], str] = {}
 
-        headers = list(self.header_pattern.finditer(content))
+        headers = list(_HEADER_RE.finditer(content))
 
         if not headers:
             return [{"header_path": "Document", "content": content.strip()}]
@@ -130,7 +200,11 @@ class ChunkingEngine:
             section_content = content[start:end].strip()
 
             if section_content:
-                header_path = " > ".join(h for h in current_headers if h)
+                key = tuple(current_headers)
+                header_path = path_cache.get(key)
+                if header_path is None:
+                    header_path = " > ".join(h for h in key if h)
+                    path_cache[key] = header_path
                 sections.append(
                     {
                         "header_path": header_path,
@@ -157,9 +231,17 @@ class ChunkingEngine:
         parents = []
         buffer_content = ""
         buffer_header = ""
+        buffer_tokens = 0
+
+        # One batched call instead of an encode per section; lengths include
+        # special tokens to match what encode() would have counted
+        num_special = self.tokenizer.num_special_tokens_to_add()
+        encodings = self.tokenizer(
+            [section["content"] for section in sections], add_special_tokens=False
+        )["input_ids"]
 
-        for section in sections:
-            section_tokens = len(self.tokenizer.encode(section["content"]))
+        for section, section_ids in zip(sections, encodings):
+            section_tokens = len(section_ids) + num_special
 
             if section_tokens > self.parent_max_tokens:
                 if buffer_content:
@@ -176,7 +258,11 @@ class ChunkingEngine:
             elif section_tokens < self.parent_min_tokens:
                 if buffer_content:
                     combined = buffer_content + "\n\n" + section["content"]
-                    combined_tokens = len(self.tokenizer.encode(combined))
+                    # Upper bound (the separator adds at most one token);
+                    # only re-tokenize when it overflows
+                    combined_tokens = buffer_tokens + section_tokens - num_special + 1
+                    if combined_tokens > self.parent_max_tokens:
+                        combined_tokens = len(self.tokenizer.encode(combined))
 
                     if combined_tokens > self.parent_max_tokens:
                         parents.append(
@@ -186,11 +272,14 @@ class ChunkingEngine:
                         )
                         buffer_content = section["content"]
                         buffer_header = section["header_path"]
+                        buffer_tokens = section_tokens
                     else:
                         buffer_content = combined
+                        buffer_tokens = combined_tokens
                 else:
                     buffer_content = section["content"]
                     buffer_header = section["header_path"]
+                    buffer_tokens = section_tokens
             else:
                 if buffer_content:
                     parents.append(
@@ -227,12 +316,16 @@ class ChunkingEngine:
         Returns:
             List of ParentChunk objects
         """
-        sentences = nltk.sent_tokenize(section["content"])
+        sentences = _split_sentences(section["content"])
         parents = []
         current_chunk = ""
+        current_tokens = 0
+
+        num_special = self.tokenizer.num_special_tokens_to_add()
+        encodings = self.tokenizer(sentences, add_special_tokens=False)["input_ids"]
 
-        for sentence in sentences:
-            sentence_tokens = len(self.tokenizer.encode(sentence))
+        for sentence, sentence_ids in zip(sentences, encodings):
+            sentence_tokens = len(sentence_ids) + num_special
 
             if sentence_tokens > self.parent_max_tokens:
                 if current_chunk:
@@ -242,6 +335,7 @@ class ChunkingEngine:
                         )
                     )
                     current_chunk = ""
+                    current_tokens = 0
 
                 tokens = self.tokenizer.encode(sentence)
                 for i in range(0, len(tokens), self.parent_max_tokens):
@@ -254,23 +348,30 @@ class ChunkingEngine:
                             chunk_text, section["header_path"], file_hash, file_name
                         )
                     )
+            elif not current_chunk:
+                current_chunk = sentence
+                current_tokens = sentence_tokens
             else:
-                test_chunk = (
-                    current_chunk + " " + sentence if current_chunk else sentence
-                )
-                if len(self.tokenizer.encode(test_chunk)) > self.parent_max_tokens:
-                    if current_chunk:
-                        parents.append(
-                            self._make_parent(
-                                current_chunk,
-                                section["header_path"],
-                                file_hash,
-                                file_name,
-                            )
+                test_chunk = current_chunk + " " + sentence
+                # Same upper bound as in _create_parents
+                test_tokens = current_tokens + sentence_tokens - num_special + 1
+                if test_tokens > self.parent_max_tokens:
+                    test_tokens = len(self.tokenizer.encode(test_chunk))
+
+                if test_tokens > self.parent_max_tokens:
+                    parents.append(
+                        self._make_parent(
+                            current_chunk,
+                            section["header_path"],
+                            file_hash,
+                            file_name,
                         )
+                    )
                     current_chunk = sentence
+                    current_tokens = sentence_tokens
                 else:
                     current_chunk = test_chunk
+                    current_tokens = test_tokens
 
         if current_chunk:
             parents.append(
@@ -296,10 +397,7 @@ class ChunkingEngine:
         Returns:
             ParentChunk object
         """
-        content_hash = hashlib.md5(
-            f"{file_hash}:{header_path}:{content[:100]}".encode()
-        ).hexdigest()
-        parent_uuid = str(uuid.UUID(content_hash))
+        parent_uuid = _content_id(f"{file_hash}:{header_path}:{content[:100]}")
 
         return ParentChunk(
             id=parent_uuid,
@@ -320,31 +418,34 @@ class ChunkingEngine:
         Returns:
             List of ChildChunk objects
         """
-        children = []
+        children: list[ChildChunk] = []
         MAX_TOKENS = 8192
 
-        for parent in parents:
-            tokens = self.tokenizer.encode(parent.content)
+        if not parents:
+            return children
 
+        # Encode every parent in one batched call; children are sliced out of
+        # the parent text via token character offsets instead of decoded
+        encodings = self.tokenizer(
+            [parent.content for parent in parents], return_offsets_mapping=True
+        )
+        stride = self.child_tokens - self.child_overlap
+
+        for parent, tokens, offsets in zip(
+            parents, encodings["input_ids"], encodings["offset_mapping"]
+        ):
+            # Only the children are capped; the parent keeps its full text
+            # since it is what gets handed to the LLM as context
             if len(tokens) > MAX_TOKENS:
                 tokens = tokens[:MAX_TOKENS]
-                parent.content = self.tokenizer.decode(tokens, skip_special_tokens=True)
-
-            stride = self.child_tokens - self.child_overlap
+                offsets = offsets[:MAX_TOKENS]
 
             chunk_index = 0
             for start in range(0, len(tokens), stride):
                 end = min(start + self.child_tokens, len(tokens))
-                chunk_tokens = tokens[start:end]
-
-                chunk_text = self.tokenizer.decode(
-                    chunk_tokens, skip_special_tokens=True
-                )
+                chunk_text = self._slice_offsets(parent.content, offsets[start:end])
 
-                child_hash = hashlib.md5(
-                    f"{parent.id}:{chunk_index}:{chunk_text[:50]}".encode()
-                ).hexdigest()
-                child_id = str(uuid.UUID(child_hash))
+                child_id = _content_id(f"{parent.id}:{chunk_index}:{chunk_text[:50]}")
                 parent.child_ids.append(child_id)
 
                 children.append(
@@ -365,3 +466,22 @@ class ChunkingEngine:
                     break
 
         return children
+
+    @staticmethod
+    def _slice_offsets(content: str, offsets: list[tuple[int, int]]) -> str:
+        """
+        Slice the text covered by a window of token offsets.
+
+        Special tokens have empty (0, 0) offsets and are skipped.
+
+        Args:
+            content: Text the offsets refer to
+            offsets: (char_start, char_end) per token in the window
+
+        Returns:
+            Stripped substring from the first to the last real token
+        """
+        spans = [span for span in offsets if span[1] > span[0]]
+        if not spans:
+            return ""
+        return content[spans[0][0] : spans[-1][1]].strip()
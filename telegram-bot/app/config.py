@@ -8,6 +8,9 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 # Suppress HuggingFace symlink warnings on Windows
 os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
 
+# Let the Rust tokenizer parallelize batched encode/decode calls
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -31,13 +34,18 @@ class Settings(BaseSettings):
 
     # Service URLs
     qdrant_url: str = "http://localhost:6333"
+    qdrant_prefer_grpc: bool = True
+    qdrant_grpc_port: int = 6334
     ml_api_url: str = "http://localhost:8001"
 
     # Caching Configuration
     embedding_cache_size: int = 1000
+    markdown_cache_dir: str = "./uploads/markdown"
+    markdown_cache_max_mb: int = 500
 
     # Conversation History
     max_history_turns: int = 3
+    max_history_users: int = 10_000
 
     # HuggingFace
     hf_home: str = "./models_cache"
@@ -1,5 +1,5 @@
 """Database clients."""
 
-from .qdrant_client import QdrantDB
+from .qdrant_client import QdrantDB, get_qdrant_db
 
-__all__ = ["QdrantDB"]
+__all__ = ["QdrantDB", "get_qdrant_db"]
@@ -1,16 +1,125 @@
 """Qdrant vector database client."""
 
+import uuid
+from functools import lru_cache
 from typing import Any, Optional
 
+import numpy as np
 from qdrant_client import QdrantClient, models
 
+from ..chunking import ChildChunk, ParentChunk
 from ..config import settings
 
 CHUNKS_COLLECTION = "chunks"
 PARENTS_COLLECTION = "parents"
+FILES_COLLECTION = "files"
 DENSE_VECTOR_SIZE = 1024
 DENSE_VECTOR_NAME = "dense"
 SPARSE_VECTOR_NAME = "sparse"
+UPSERT_BATCH_SIZE = 256
+
+# Search the int8-quantized dense vectors, then rescore an oversampled
+# candidate set with the original vectors
+DENSE_QUANTIZATION_PARAMS = models.QuantizationSearchParams(
+    rescore=True, oversampling=2.0
+)
+# HNSW beam width for dense prefetches. Fixed rather than left to the
+# collection's ef_construct so query latency does not move with index
+# settings; 128 covers the oversampled candidates of the default search.
+DENSE_HNSW_EF = 128
+
+# Payload fields returned by retrieval; anything else (chunk_index, child_ids)
+# stays on the server
+CHUNK_RESULT_FIELDS = ["content", "parent_id", "file_name", "header_path"]
+PARENT_RESULT_FIELDS = ["content", "file_name", "header_path"]
+
+
+def _file_point_id(file_hash: str) -> str:
+    """
+    Derive the files-collection point ID for a file.
+
+    Args:
+        file_hash: SHA256 hash of the file
+
+    Returns:
+        Deterministic UUID string for the file
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"file:{file_hash}"))
+
+
+def _file_filter(file_hashes: Optional[list[str]]) -> Optional[models.Filter]:
+    """
+    Build the file_hash filter for a search.
+
+    Args:
+        file_hashes: File hashes to restrict results to, or None for all files
+
+    Returns:
+        Filter matching any of the hashes, None when unrestricted
+    """
+    if not file_hashes:
+        return None
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="file_hash", match=models.MatchAny(any=file_hashes)
+            )
+        ]
+    )
+
+
+def _hybrid_prefetch(
+    query_dense: list[float],
+    query_sparse: dict[int, float],
+    filter_conditions: Optional[models.Filter],
+    limit: int,
+    hnsw_ef: int,
+) -> list[models.Prefetch]:
+    """
+    Build the dense and sparse prefetches fused by a hybrid search.
+
+    Args:
+        query_dense: Dense query vector
+        query_sparse: Sparse query vector
+        filter_conditions: Optional filter applied to both prefetches
+        limit: Final result limit; each prefetch fetches twice as many
+        hnsw_ef: HNSW beam width for the dense prefetch
+
+    Returns:
+        Dense and sparse prefetch queries
+    """
+    return [
+        models.Prefetch(
+            query=query_dense,
+            using=DENSE_VECTOR_NAME,
+            limit=limit * 2,
+            filter=filter_conditions,
+            params=models.SearchParams(
+                hnsw_ef=hnsw_ef, quantization=DENSE_QUANTIZATION_PARAMS
+            ),
+        ),
+        models.Prefetch(
+            query=models.SparseVector(
+                indices=list(query_sparse.keys()),
+                values=list(query_sparse.values()),
+            ),
+            using=SPARSE_VECTOR_NAME,
+            limit=limit * 2,
+            filter=filter_conditions,
+        ),
+    ]
+
+
+def _chunk_result(point: models.ScoredPoint) -> dict[str, Any]:
+    """Convert a scored chunk point into a search result dict."""
+    return {
+        "id": point.id,
+        "score": point.score,
+        "content": point.payload["content"],  # type: ignore
+        "parent_id": point.payload["parent_id"],  # type: ignore
+        "file_name": point.payload["file_name"],  # type: ignore
+        "header_path": point.payload["header_path"],  # type: ignore
+    }
 
 
 class QdrantDB:
@@ -23,11 +132,19 @@ class QdrantDB:
         Args:
             url: Qdrant server URL. Defaults to settings.qdrant_url.
         """
-        self.client = QdrantClient(url=url or settings.qdrant_url)
+        self.client = QdrantClient(
+            url=url or settings.qdrant_url,
+            prefer_grpc=settings.qdrant_prefer_grpc,
+            grpc_port=settings.qdrant_grpc_port,
+            timeout=int(settings.http_timeout),
+        )
+        # Hashes known to be indexed. Only positives are remembered: a file
+        # stays indexed until delete_file, while a miss leads to ingestion
+        self._indexed_files: set[str] = set()
         self._init_collections()
 
     def _init_collections(self) -> None:
-        """Initialize chunks and parents collections."""
+        """Initialize chunks, parents and files collections."""
         collections = [c.name for c in self.client.get_collections().collections]
 
         if CHUNKS_COLLECTION not in collections:
@@ -35,7 +152,9 @@ class QdrantDB:
                 collection_name=CHUNKS_COLLECTION,
                 vectors_config={
                     DENSE_VECTOR_NAME: models.VectorParams(
-                        size=DENSE_VECTOR_SIZE, distance=models.Distance.COSINE
+                        size=DENSE_VECTOR_SIZE,
+                        distance=models.Distance.COSINE,
+                        on_disk=True,
                     )
                 },
                 sparse_vectors_config={
@@ -43,13 +162,90 @@ class QdrantDB:
                         index=models.SparseIndexParams(on_disk=False)
                     )
                 },
+                # HNSW walks int8 copies of the dense vectors held in RAM; the
+                # float originals stay on disk and are only read to rescore
+                # the top candidates
+                quantization_config=models.ScalarQuantization(
+                    scalar=models.ScalarQuantizationConfig(
+                        type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                    )
+                ),
+                # Chunk text is only read for the final hits, so it is served
+                # from mmap'd storage instead of competing with the index
+                on_disk_payload=True,
             )
 
         if PARENTS_COLLECTION not in collections:
             self.client.create_collection(
-                collection_name=PARENTS_COLLECTION, vectors_config={}
+                collection_name=PARENTS_COLLECTION,
+                vectors_config={},
+                on_disk_payload=True,
             )
 
+        # Searches, existence checks and deletes all filter on file_hash;
+        # nothing filters on file_name, so it is left unindexed
+        for collection_name in (CHUNKS_COLLECTION, PARENTS_COLLECTION):
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name="file_hash",
+                field_schema=models.KeywordIndexParams(
+                    type=models.KeywordIndexType.KEYWORD, is_tenant=False
+                ),
+            )
+
+        # One point per indexed file, so listing files is not a full scan
+        # of the parents collection
+        if FILES_COLLECTION not in collections:
+            self.client.create_collection(
+                collection_name=FILES_COLLECTION, vectors_config={}
+            )
+            if PARENTS_COLLECTION in collections:
+                self._backfill_files()
+
+    def _backfill_files(self) -> None:
+        """Populate the files collection from parents indexed before it existed."""
+        files: dict[str, str] = {}
+        offset = None
+
+        while True:
+            results, offset = self.client.scroll(
+                collection_name=PARENTS_COLLECTION,
+                limit=100,
+                offset=offset,
+                with_payload=["file_hash", "file_name"],
+            )
+
+            for point in results:
+                if point.payload is None:
+                    continue
+                files.setdefault(point.payload["file_hash"], point.payload["file_name"])
+
+            if offset is None:
+                break
+
+        if files:
+            self._store_files(files)
+
+    def _store_files(self, files: dict[str, str]) -> None:
+        """
+        Upsert one files-collection point per file.
+
+        Args:
+            files: Mapping of file_hash to file_name
+        """
+        self.client.upsert(
+            collection_name=FILES_COLLECTION,
+            points=[
+                models.PointStruct(
+                    id=_file_point_id(file_hash),
+                    vector={},
+                    payload={"file_hash": file_hash, "file_name": file_name},
+                )
+                for file_hash, file_name in files.items()
+            ],
+        )
+        self._indexed_files.update(files)
+
     def file_exists(self, file_hash: str) -> bool:
         """
         Check if a file has already been indexed.
@@ -60,82 +256,137 @@ class QdrantDB:
         Returns:
             True if file exists in database, False otherwise
         """
-        result = self.client.scroll(
+        if file_hash in self._indexed_files:
+            return True
+
+        # Count only moves an integer; the file_hash payload index keeps the
+        # exact count cheap
+        result = self.client.count(
             collection_name=PARENTS_COLLECTION,
-            scroll_filter=models.Filter(
+            count_filter=models.Filter(
                 must=[
                     models.FieldCondition(
                         key="file_hash", match=models.MatchValue(value=file_hash)
                     )
                 ]
             ),
-            limit=1,
+            exact=True,
         )
-        return len(result[0]) > 0
+        if result.count > 0:
+            self._indexed_files.add(file_hash)
+            return True
+        return False
+
+    def files_exist(self, file_hashes: list[str]) -> set[str]:
+        """
+        Check which of several files have already been indexed.
+
+        Args:
+            file_hashes: SHA256 hashes of the files
+
+        Returns:
+            Subset of file_hashes that exist in the database
+        """
+        if not file_hashes:
+            return set()
+
+        # One point per file in the files collection, so a single retrieve by
+        # ID answers for every hash
+        points = self.client.retrieve(
+            collection_name=FILES_COLLECTION,
+            ids=[_file_point_id(file_hash) for file_hash in file_hashes],
+            with_payload=["file_hash"],
+        )
+        return {point.payload["file_hash"] for point in points}  # type: ignore
 
     def store_chunks(
         self,
-        chunks: list[dict[str, Any]],
-        dense_vectors: list[list[float]],
-        sparse_vectors: list[dict[int, float]],
+        chunks: list[ChildChunk],
+        dense_vectors: np.ndarray,
+        sparse_vectors: list[tuple[np.ndarray, np.ndarray]],
     ) -> None:
         """
         Store child chunks with their vectors.
 
         Args:
-            chunks: List of chunk metadata dicts
-            dense_vectors: Dense embedding vectors (1024-dim)
-            sparse_vectors: Sparse vectors as {index: value} dicts
+            chunks: Child chunks from the chunking engine
+            dense_vectors: Dense embedding vectors, float32 of shape (N, 1024)
+            sparse_vectors: Sparse vectors as (int32 indices, float32 values)
+                array pairs
         """
         points = []
         for i, chunk in enumerate(chunks):
+            indices, values = sparse_vectors[i]
             points.append(
                 models.PointStruct(
-                    id=chunk["id"],
+                    id=chunk.id,
                     vector={
                         DENSE_VECTOR_NAME: dense_vectors[i],
+                        # Pydantic validates the numpy arrays without tolist()
                         SPARSE_VECTOR_NAME: models.SparseVector(
-                            indices=list(sparse_vectors[i].keys()),
-                            values=list(sparse_vectors[i].values()),
+                            indices=indices,  # type: ignore
+                            values=values,  # type: ignore
                         ),
                     },
                     payload={
-                        "content": chunk["content"],
-                        "parent_id": chunk["parent_id"],
-                        "file_hash": chunk["file_hash"],
-                        "file_name": chunk["file_name"],
-                        "chunk_index": chunk["chunk_index"],
-                        "header_path": chunk["header_path"],
+                        "content": chunk.content,
+                        "parent_id": chunk.parent_id,
+                        "file_hash": chunk.file_hash,
+                        "file_name": chunk.file_name,
+                        "chunk_index": chunk.chunk_index,
+                        "header_path": chunk.header_path,
                     },
                 )
             )
 
-        self.client.upsert(collection_name=CHUNKS_COLLECTION, points=points)
+        self._upsert_batched(CHUNKS_COLLECTION, points)
 
-    def store_parents(self, parents: list[dict[str, Any]]) -> None:
+    def store_parents(self, parents: list[ParentChunk]) -> None:
         """
         Store parent chunks (no vectors).
 
         Args:
-            parents: List of parent chunk metadata dicts
+            parents: Parent chunks from the chunking engine
         """
         points = []
         for parent in parents:
             points.append(
                 models.PointStruct(
-                    id=parent["id"],
+                    id=parent.id,
                     vector={},
                     payload={
-                        "content": parent["content"],
-                        "file_hash": parent["file_hash"],
-                        "file_name": parent["file_name"],
-                        "header_path": parent["header_path"],
-                        "child_ids": parent["child_ids"],
+                        "content": parent.content,
+                        "file_hash": parent.file_hash,
+                        "file_name": parent.file_name,
+                        "header_path": parent.header_path,
+                        "child_ids": parent.child_ids,
                     },
                 )
             )
 
-        self.client.upsert(collection_name=PARENTS_COLLECTION, points=points)
+        self._upsert_batched(PARENTS_COLLECTION, points)
+        self._store_files({p.file_hash: p.file_name for p in parents})
+
+    def _upsert_batched(
+        self, collection_name: str, points: list[models.PointStruct]
+    ) -> None:
+        """
+        Upsert points in batches of UPSERT_BATCH_SIZE.
+
+        Only the last batch waits for the write to be applied; Qdrant applies
+        updates to a collection in order, so the earlier batches are done too.
+
+        Args:
+            collection_name: Target collection
+            points: Points to upsert
+        """
+        for start in range(0, len(points), UPSERT_BATCH_SIZE):
+            end = start + UPSERT_BATCH_SIZE
+            self.client.upsert(
+                collection_name=collection_name,
+                points=points[start:end],
+                wait=end >= len(points),
+            )
 
     def hybrid_search(
         self,
@@ -143,6 +394,7 @@ class QdrantDB:
         query_sparse: dict[int, float],
         file_hashes: Optional[list[str]] = None,
         limit: int = 20,
+        hnsw_ef: int = DENSE_HNSW_EF,
     ) -> list[dict[str, Any]]:
         """
         Hybrid search with RRF fusion.
@@ -152,56 +404,67 @@ class QdrantDB:
             query_sparse: Sparse query vector
             file_hashes: Optional list of file hashes to filter by
             limit: Maximum results to return
+            hnsw_ef: HNSW beam width; lower is faster at some cost in recall
 
         Returns:
             List of child chunks with metadata
         """
-        filter_conditions = None
-        if file_hashes:
-            filter_conditions = models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="file_hash", match=models.MatchAny(any=file_hashes)
-                    )
-                ]
-            )
-
-        prefetch = [
-            models.Prefetch(
-                query=query_dense,
-                using=DENSE_VECTOR_NAME,
-                limit=limit * 2,
-                filter=filter_conditions,
-            ),
-            models.Prefetch(
-                query=models.SparseVector(
-                    indices=list(query_sparse.keys()),
-                    values=list(query_sparse.values()),
-                ),
-                using=SPARSE_VECTOR_NAME,
-                limit=limit * 2,
-                filter=filter_conditions,
-            ),
-        ]
-
         results = self.client.query_points(
             collection_name=CHUNKS_COLLECTION,
-            prefetch=prefetch,
+            prefetch=_hybrid_prefetch(
+                query_dense, query_sparse, _file_filter(file_hashes), limit, hnsw_ef
+            ),
             query=models.FusionQuery(fusion=models.Fusion.RRF),
             limit=limit,
-            with_payload=True,
+            with_payload=models.PayloadSelectorInclude(include=CHUNK_RESULT_FIELDS),
+        )
+
+        return [_chunk_result(point) for point in results.points]
+
+    def hybrid_search_batch(
+        self,
+        queries_dense: list[list[float]],
+        queries_sparse: list[dict[int, float]],
+        file_hashes: Optional[list[str]] = None,
+        limit: int = 20,
+        hnsw_ef: int = DENSE_HNSW_EF,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Hybrid search for several queries in one round trip.
+
+        Args:
+            queries_dense: Dense query vectors
+            queries_sparse: Sparse query vectors, one per dense vector
+            file_hashes: Optional list of file hashes to filter by
+            limit: Maximum results to return per query
+            hnsw_ef: HNSW beam width; lower is faster at some cost in recall
+
+        Returns:
+            One list of child chunks with metadata per query, in query order
+        """
+        if not queries_dense:
+            return []
+
+        filter_conditions = _file_filter(file_hashes)
+        requests = [
+            models.QueryRequest(
+                prefetch=_hybrid_prefetch(
+                    query_dense, query_sparse, filter_conditions, limit, hnsw_ef
+                ),
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=limit,
+                with_payload=models.PayloadSelectorInclude(include=CHUNK_RESULT_FIELDS),
+            )
+            for query_dense, query_sparse in zip(queries_dense, queries_sparse)
+        ]
+
+        responses = self.client.query_batch_points(
+            collection_name=CHUNKS_COLLECTION, requests=requests
         )
 
         return [
-            {
-                "id": point.id,
-                "score": point.score,
-                "content": point.payload["content"],  # type: ignore
-                "parent_id": point.payload["parent_id"],  # type: ignore
-                "file_name": point.payload["file_name"],  # type: ignore
-                "header_path": point.payload["header_path"],  # type: ignore
-            }
-            for point in results.points
+            [_chunk_result(point) for point in response.points]
+            for response in responses
         ]
 
     def get_parents(self, parent_ids: list[str]) -> list[dict[str, Any]]:
@@ -217,7 +480,7 @@ class QdrantDB:
         results = self.client.retrieve(
             collection_name=PARENTS_COLLECTION,
             ids=parent_ids,
-            with_payload=True,
+            with_payload=models.PayloadSelectorInclude(include=PARENT_RESULT_FIELDS),
         )
 
         return [
@@ -237,13 +500,13 @@ class QdrantDB:
         Returns:
             List of dicts with file_hash and file_name
         """
-        files: dict[str, dict[str, str]] = {}
+        files: list[dict[str, str]] = []
         offset = None
 
         while True:
             results, offset = self.client.scroll(
-                collection_name=PARENTS_COLLECTION,
-                limit=100,
+                collection_name=FILES_COLLECTION,
+                limit=1000,
                 offset=offset,
                 with_payload=["file_hash", "file_name"],
             )
@@ -251,17 +514,17 @@ class QdrantDB:
             for point in results:
                 if point.payload is None:
                     continue
-                file_hash = point.payload["file_hash"]
-                if file_hash not in files:
-                    files[file_hash] = {
-                        "file_hash": file_hash,
+                files.append(
+                    {
+                        "file_hash": point.payload["file_hash"],
                         "file_name": point.payload["file_name"],
                     }
+                )
 
             if offset is None:
                 break
 
-        return list(files.values())
+        return files
 
     def delete_file(self, file_hash: str) -> None:
         """
@@ -280,10 +543,33 @@ class QdrantDB:
             )
         )
 
+        self._indexed_files.discard(file_hash)
+
+        # The chunk delete is the largest and is applied while the parent and
+        # file deletes run. A search in that window can still hit a chunk,
+        # but its parent is already gone, so it contributes no context.
         self.client.delete(
-            collection_name=CHUNKS_COLLECTION, points_selector=filter_selector
+            collection_name=CHUNKS_COLLECTION,
+            points_selector=filter_selector,
+            wait=False,
         )
 
         self.client.delete(
             collection_name=PARENTS_COLLECTION, points_selector=filter_selector
         )
+
+        self.client.delete(
+            collection_name=FILES_COLLECTION,
+            points_selector=models.PointIdsList(points=[_file_point_id(file_hash)]),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_qdrant_db() -> QdrantDB:
+    """
+    Get the process-wide QdrantDB so all callers share one client connection.
+
+    Returns:
+        Shared QdrantDB instance
+    """
+    return QdrantDB()
@@ -1,5 +1,6 @@
 """Ask command handler for RAG queries."""
 
+import io
 import logging
 
 from telegram import Message, Update
@@ -11,6 +12,41 @@ from ..utils.history import HistoryManager
 
 logger = logging.getLogger(__name__)
 
+# Telegram's limit is 4096 UTF-16 code units; leave headroom for surrogates
+MESSAGE_LIMIT = 4000
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> list[str]:
+    """
+    Split text into Telegram-sized messages at line boundaries.
+
+    Keeping whole lines together avoids cutting Markdown entities (and
+    multi-codepoint emoji) in half. Only a single line longer than the limit
+    is split mid-line.
+
+    Args:
+        text: Text to split
+        limit: Maximum characters per message
+
+    Returns:
+        List of message texts
+    """
+    chunks = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        if len(current) + len(line) > limit:
+            if current:
+                chunks.append(current)
+            while len(line) > limit:
+                chunks.append(line[:limit])
+                line = line[limit:]
+            current = line
+        else:
+            current += line
+    if current:
+        chunks.append(current)
+    return chunks
+
 
 async def safe_reply(message: Message, text: str) -> None:
     """
@@ -23,7 +59,9 @@ async def safe_reply(message: Message, text: str) -> None:
     try:
         await message.reply_text(text, parse_mode="Markdown")
     except BadRequest as e:
-        if "can't parse entities" in str(e).lower():
+        # Match the case-insensitive tail of Telegram's "can't parse entities"
+        # on the raw message rather than lowercasing a copy of it
+        if "parse entities" in e.message:
             logger.warning(f"Markdown parsing failed, sending as plain text: {e}")
             await message.reply_text(text)
         else:
@@ -66,26 +104,24 @@ async def ask_command(
     await update.message.chat.send_action("typing")
 
     # Stream response from RAG
-    response_parts = []
+    buffer = io.StringIO()
     try:
         async for token in orchestrator.query(query, chat_history=chat_history):
-            response_parts.append(token)
+            buffer.write(token)
     except Exception as e:
         logger.exception(f"RAG query failed: {e}")
         await update.message.reply_text(f"❌ An error occurred: {str(e)}")
         return
 
-    response = "".join(response_parts)
+    response = buffer.getvalue()
 
     # Update conversation history
     history_manager.add_user_message(user_id, query)
     history_manager.add_assistant_message(user_id, response)
 
     # Send response (split if too long)
-    if len(response) > 4000:
-        # Telegram message limit is 4096 characters
-        for i in range(0, len(response), 4000):
-            chunk = response[i : i + 4000]
+    if len(response) > MESSAGE_LIMIT:
+        for chunk in split_message(response):
             await safe_reply(update.message, chunk)
     else:
         await safe_reply(update.message, response)
@@ -174,13 +210,13 @@ async def summarize_command(
     file_name = " ".join(context.args)
     await update.message.chat.send_action("typing")
 
-    response_parts = []
+    buffer = io.StringIO()
     async for token in orchestrator.summarize(file_name):
-        response_parts.append(token)
+        buffer.write(token)
 
-    response = "".join(response_parts)
-    if len(response) > 4000:
-        for i in range(0, len(response), 4000):
-            await safe_reply(update.message, response[i : i + 4000])
+    response = buffer.getvalue()
+    if len(response) > MESSAGE_LIMIT:
+        for chunk in split_message(response):
+            await safe_reply(update.message, chunk)
     else:
         await safe_reply(update.message, response)
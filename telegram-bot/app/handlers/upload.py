@@ -1,28 +1,72 @@
 """File upload handler for document ingestion."""
 
+import asyncio
 import hashlib
+import io
 import os
 from pathlib import Path
 
-from markitdown import MarkItDown
+from markitdown import MarkItDown, StreamInfo
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from ..chunking import ChunkingEngine
 from ..database import QdrantDB
 from ..services.ml_api_client import MLAPIClient
+from ..utils.markdown_cache import MarkdownCache
 
 UPLOAD_DIR = Path("./uploads")
-ALLOWED_EXTENSIONS = {".pdf", ".txt", ".md", ".docx", ".doc", ".epub"}
+ALLOWED_EXTENSIONS = frozenset({".pdf", ".txt", ".md", ".docx", ".doc", ".epub"})
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 
 
+def convert_to_markdown(
+    md_converter: MarkItDown,
+    markdown_cache: MarkdownCache,
+    source: Path | bytes | bytearray,
+    file_hash: str,
+    file_ext: str = "",
+) -> str | None:
+    """
+    Extract markdown from a document, reusing a cached conversion if present.
+
+    Args:
+        md_converter: MarkItDown converter
+        markdown_cache: Disk cache of previous conversions
+        source: Document path, or its contents already held in memory
+        file_hash: SHA256 hash of the document
+        file_ext: Extension hint for in-memory contents (e.g. ".pdf")
+
+    Returns:
+        Markdown content, or None if no text could be extracted
+    """
+    cached = markdown_cache.get(file_hash)
+    if cached is not None:
+        return cached
+
+    if isinstance(source, Path):
+        result = md_converter.convert(str(source))
+    else:
+        result = md_converter.convert_stream(
+            io.BytesIO(source), stream_info=StreamInfo(extension=file_ext)
+        )
+
+    markdown_content: str | None = result.text_content
+    if not markdown_content or markdown_content.isspace():
+        return None
+
+    markdown_cache.put(file_hash, markdown_content)
+    return markdown_content
+
+
 async def handle_document(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
     db: QdrantDB,
     ml_client: MLAPIClient,
     chunking_engine: ChunkingEngine,
+    md_converter: MarkItDown,
+    markdown_cache: MarkdownCache,
 ) -> None:
     """
     Handle document upload for ingestion.
@@ -33,6 +77,8 @@ async def handle_document(
         db: Qdrant database client
         ml_client: ML API client for embeddings
         chunking_engine: Document chunking engine
+        md_converter: Shared MarkItDown converter
+        markdown_cache: Disk cache of extracted markdown
     """
     if update.message is None or update.message.document is None:
         return
@@ -41,7 +87,8 @@ async def handle_document(
 
     # Validate file extension
     file_name = document.file_name or "unknown"
-    file_ext = Path(file_name).suffix.lower()
+    dot = file_name.rfind(".")
+    file_ext = file_name[dot:].lower() if dot >= 0 else ""
 
     if file_ext not in ALLOWED_EXTENSIONS:
         await update.message.reply_text(
@@ -69,14 +116,10 @@ async def handle_document(
         # Download file
         file = await context.bot.get_file(document.file_id)
 
-        UPLOAD_DIR.mkdir(exist_ok=True)
-        file_path = UPLOAD_DIR / file_name
-
-        await file.download_to_drive(str(file_path))
-
-        # Calculate file hash
-        with open(file_path, "rb") as f:
-            file_hash = hashlib.sha256(f.read()).hexdigest()
+        # Download into memory (at most MAX_FILE_SIZE) and hash the buffer,
+        # so the file only touches disk once and only if it is new
+        content = await file.download_as_bytearray()
+        file_hash = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
 
         # Check if already indexed
         if db.file_exists(file_hash):
@@ -84,20 +127,29 @@ async def handle_document(
                 f"ℹ️ This file has already been indexed: `{file_name}`",
                 parse_mode="Markdown",
             )
-            os.remove(file_path)
             return
 
-        # Convert to markdown
+        # Convert to markdown from the in-memory copy while it is saved to disk
         await progress_msg.edit_text(
             "📄 Converting document to text...",
             parse_mode="Markdown",
         )
 
-        md = MarkItDown()
-        result = md.convert(str(file_path))
-        markdown_content = result.text_content
+        UPLOAD_DIR.mkdir(exist_ok=True)
+        file_path = UPLOAD_DIR / file_name
+        _, markdown_content = await asyncio.gather(
+            asyncio.to_thread(file_path.write_bytes, content),
+            asyncio.to_thread(
+                convert_to_markdown,
+                md_converter,
+                markdown_cache,
+                content,
+                file_hash,
+                file_ext,
+            ),
+        )
 
-        if not markdown_content or not markdown_content.strip():
+        if markdown_content is None:
             await progress_msg.edit_text(
                 "❌ Could not extract text from the document.",
                 parse_mode="Markdown",
@@ -138,38 +190,12 @@ async def handle_document(
             parse_mode="Markdown",
         )
 
-        # Prepare chunk dicts
-        chunk_dicts = [
-            {
-                "id": c.id,
-                "content": c.content,
-                "parent_id": c.parent_id,
-                "file_hash": c.file_hash,
-                "file_name": c.file_name,
-                "chunk_index": c.chunk_index,
-                "header_path": c.header_path,
-            }
-            for c in children
-        ]
-
-        parent_dicts = [
-            {
-                "id": p.id,
-                "content": p.content,
-                "file_hash": p.file_hash,
-                "file_name": p.file_name,
-                "header_path": p.header_path,
-                "child_ids": p.child_ids,
-            }
-            for p in parents
-        ]
-
         db.store_chunks(
-            chunk_dicts,
+            children,
             embeddings["dense_vecs"],
             embeddings["sparse_vecs"],
         )
-        db.store_parents(parent_dicts)
+        db.store_parents(parents)
 
         # Success
         await progress_msg.edit_text(
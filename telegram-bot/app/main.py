@@ -1,10 +1,11 @@
 """Telegram RAG Bot - Main Application Entry Point."""
 
 import asyncio
-import hashlib
 import logging
+import os
 from pathlib import Path
 
+from markitdown import MarkItDown
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -16,13 +17,19 @@ from telegram.ext import (
 
 from .chunking import ChunkingEngine
 from .config import settings
-from .database import QdrantDB
+from .database import get_qdrant_db
 from .handlers.ask import ask_command, clear_command, stats_command, summarize_command
 from .handlers.help import help_command, start_command
-from .handlers.upload import handle_document, list_files_command
+from .handlers.upload import (
+    convert_to_markdown,
+    handle_document,
+    list_files_command,
+)
 from .rag.orchestrator import RAGOrchestrator
 from .services.ml_api_client import MLAPIClient
+from .utils.hashing import sha256_file
 from .utils.history import HistoryManager
+from .utils.markdown_cache import MarkdownCache
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -39,14 +46,22 @@ class BotApplication:
 
     def __init__(self) -> None:
         """Initialize bot application components."""
-        self.db = QdrantDB()
+        self.db = get_qdrant_db()
         self.ml_client = MLAPIClient()
         self.chunking_engine = ChunkingEngine()
+        self.markitdown = MarkItDown()
+        self.markdown_cache = MarkdownCache(
+            Path(settings.markdown_cache_dir),
+            max_bytes=settings.markdown_cache_max_mb * 1024 * 1024,
+        )
         self.orchestrator = RAGOrchestrator(
             db=self.db,
             ml_client=self.ml_client,
         )
-        self.history_manager = HistoryManager(max_turns=settings.max_history_turns)
+        self.history_manager = HistoryManager(
+            max_turns=settings.max_history_turns,
+            max_users=settings.max_history_users,
+        )
 
     async def seed_sample_documents(self) -> None:
         """
@@ -69,76 +84,91 @@ class BotApplication:
 
         logger.info(f"Found {len(sample_files)} sample documents")
 
-        from markitdown import MarkItDown
+        # Hash everything first so already-indexed files are found in one call.
+        # hashlib releases the GIL, so the files are hashed in parallel threads
+        results = await asyncio.gather(
+            *(asyncio.to_thread(sha256_file, path) for path in sample_files),
+            return_exceptions=True,
+        )
+        file_hashes: dict[Path, str] = {}
+        for file_path, result in zip(sample_files, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error reading {file_path.name}: {result}")
+            else:
+                file_hashes[file_path] = result
+
+        indexed = self.db.files_exist(list(file_hashes.values()))
+        for file_path, file_hash in file_hashes.items():
+            if file_hash in indexed:
+                logger.info(f"Skipping already indexed: {file_path.name}")
+
+        # Files run concurrently so one file's conversion and chunking (in
+        # worker threads) overlaps another's embedding; the semaphore keeps
+        # the CPU-bound stages to one file per core
+        semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        await asyncio.gather(
+            *(
+                self._index_sample_document(file_path, file_hash, semaphore)
+                for file_path, file_hash in file_hashes.items()
+                if file_hash not in indexed
+            )
+        )
 
-        md_converter = MarkItDown()
+    async def _index_sample_document(
+        self,
+        file_path: Path,
+        file_hash: str,
+        semaphore: asyncio.Semaphore,
+    ) -> None:
+        """
+        Convert, chunk, embed and store a single sample document.
 
-        for file_path in sample_files:
+        Args:
+            file_path: Path of the sample document
+            file_hash: SHA256 hash of the file
+            semaphore: Limits how many documents are processed at once
+        """
+        async with semaphore:
             try:
-                # Calculate file hash
-                with open(file_path, "rb") as f:
-                    file_hash = hashlib.sha256(f.read()).hexdigest()
-
-                # Skip if already indexed
-                if self.db.file_exists(file_hash):
-                    logger.info(f"Skipping already indexed: {file_path.name}")
-                    continue
-
                 logger.info(f"Indexing sample document: {file_path.name}")
 
                 # Convert to markdown
-                result = md_converter.convert(str(file_path))
-                markdown_content = result.text_content
+                markdown_content = await asyncio.to_thread(
+                    convert_to_markdown,
+                    self.markitdown,
+                    self.markdown_cache,
+                    file_path,
+                    file_hash,
+                )
 
-                if not markdown_content or not markdown_content.strip():
+                if markdown_content is None:
                     logger.warning(f"Could not extract text from {file_path.name}")
-                    continue
+                    return
 
                 # Chunk document
-                parents, children = self.chunking_engine.chunk_document(
-                    markdown_content, file_hash, file_path.name
+                parents, children = await asyncio.to_thread(
+                    self.chunking_engine.chunk_document,
+                    markdown_content,
+                    file_hash,
+                    file_path.name,
                 )
 
                 if not children:
                     logger.warning(f"No chunks produced for {file_path.name}")
-                    continue
+                    return
 
                 # Embed chunks
                 chunk_texts = [c.content for c in children]
                 embeddings = await self.ml_client.embed(chunk_texts, is_query=False)
 
                 # Store in database
-                chunk_dicts = [
-                    {
-                        "id": c.id,
-                        "content": c.content,
-                        "parent_id": c.parent_id,
-                        "file_hash": c.file_hash,
-                        "file_name": c.file_name,
-                        "chunk_index": c.chunk_index,
-                        "header_path": c.header_path,
-                    }
-                    for c in children
-                ]
-
-                parent_dicts = [
-                    {
-                        "id": p.id,
-                        "content": p.content,
-                        "file_hash": p.file_hash,
-                        "file_name": p.file_name,
-                        "header_path": p.header_path,
-                        "child_ids": p.child_ids,
-                    }
-                    for p in parents
-                ]
-
-                self.db.store_chunks(
-                    chunk_dicts,
+                await asyncio.to_thread(
+                    self.db.store_chunks,
+                    children,
                     embeddings["dense_vecs"],
                     embeddings["sparse_vecs"],
                 )
-                self.db.store_parents(parent_dicts)
+                await asyncio.to_thread(self.db.store_parents, parents)
 
                 logger.info(
                     f"Indexed {file_path.name}: "
@@ -205,7 +235,13 @@ class BotApplication:
             update: Update, context: ContextTypes.DEFAULT_TYPE
         ) -> None:
             await handle_document(
-                update, context, self.db, self.ml_client, self.chunking_engine
+                update,
+                context,
+                self.db,
+                self.ml_client,
+                self.chunking_engine,
+                self.markitdown,
+                self.markdown_cache,
             )
 
         app.add_handler(MessageHandler(filters.Document.ALL, document_handler))
@@ -1,5 +1,6 @@
 """LLM model provider for OpenAI."""
 
+import time
 from abc import ABC, abstractmethod
 from typing import AsyncGenerator, AsyncIterator
 
@@ -7,6 +8,10 @@ from openai import AsyncOpenAI
 
 from ..config import settings
 
+# Streamed deltas are coalesced until either limit is reached
+STREAM_FLUSH_CHARS = 32
+STREAM_FLUSH_SECONDS = 0.05
+
 
 class ModelProviderError(Exception):
     """Exception raised for model provider errors."""
@@ -38,6 +43,12 @@ class ModelProvider(ABC):
         pass
 
 
+def _openai_error_message(e: Exception) -> str:
+    """Format an OpenAI SDK exception, preferring its API message or body."""
+    detail = getattr(e, "message", None) or getattr(e, "body", None) or str(e)
+    return f"OpenAI API error: {type(e).__name__} - {detail}"
+
+
 class OpenAIProvider(ModelProvider):
     """OpenAI API provider implementation."""
 
@@ -64,7 +75,7 @@ class OpenAIProvider(ModelProvider):
         temperature: float = 0.3,
         max_tokens: int = 1024,
     ) -> AsyncGenerator[str, None]:
-        """Generate streaming response from OpenAI."""
+        """Generate streaming response from OpenAI, yielding coalesced deltas."""
         try:
             stream = await self.client.chat.completions.create(
                 model=self.model,
@@ -74,18 +85,28 @@ class OpenAIProvider(ModelProvider):
                 stream=True,
             )
 
+            buffer: list[str] = []
+            buffered = 0
+            last_flush = time.monotonic()
             async for chunk in stream:  # type: ignore
                 if chunk.choices and chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+                    content = chunk.choices[0].delta.content
+                    buffer.append(content)
+                    buffered += len(content)
+                    now = time.monotonic()
+                    if (
+                        buffered >= STREAM_FLUSH_CHARS
+                        or now - last_flush >= STREAM_FLUSH_SECONDS
+                    ):
+                        yield "".join(buffer)
+                        buffer.clear()
+                        buffered = 0
+                        last_flush = now
+
+            if buffer:
+                yield "".join(buffer)
         except Exception as e:
-            error_msg = f"OpenAI API error: {type(e).__name__}"
-            if hasattr(e, "message"):
-                error_msg += f" - {e.message}"
-            elif hasattr(e, "body"):
-                error_msg += f" - {e.body}"
-            else:
-                error_msg += f" - {e}"
-            raise RuntimeError(error_msg) from e
+            raise RuntimeError(_openai_error_message(e)) from e
 
     async def generate(
         self,
@@ -113,11 +134,11 @@ class OpenAIProvider(ModelProvider):
                 stream=False,
             )
             # Response is ChatCompletion when stream=False
-            assert hasattr(response, "choices"), "Unexpected response type"
+            if not hasattr(response, "choices"):
+                raise RuntimeError("Unexpected response type")
             return response.choices[0].message.content or ""
         except Exception as e:
-            error_msg = f"OpenAI API error: {type(e).__name__} - {e}"
-            raise RuntimeError(error_msg) from e
+            raise RuntimeError(_openai_error_message(e)) from e
 
 
 class ModelFactory:
@@ -5,13 +5,68 @@ from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
 
-@dataclass
+# Normalized queries longer than this are keyed by a 16-byte digest
+MAX_RAW_KEY_LENGTH = 64
+
+
+@dataclass(slots=True)
 class CachedEmbedding:
-    """Cached embedding data."""
+    """
+    Cached embedding data.
+
+    The dense vector is kept as int8 codes with a per-vector scale (~1 KB per
+    1024-dim vector instead of ~32 KB as a list of floats) and dequantized on
+    read. The sparse vector is kept as parallel int32 index / float32 value
+    arrays rather than a dict of boxed ints and floats.
+    """
+
+    codes: np.ndarray
+    scale: float
+    sparse_indices: np.ndarray
+    sparse_values: np.ndarray
+
+    @classmethod
+    def from_dense(
+        cls, dense: list[float], sparse: dict[int, float]
+    ) -> "CachedEmbedding":
+        """
+        Quantize a dense vector to symmetric per-tensor int8 and pack the
+        sparse vector into arrays.
+
+        Args:
+            dense: Dense embedding vector
+            sparse: Sparse embedding vector
+
+        Returns:
+            CachedEmbedding holding the quantized vector
+        """
+        vector = np.asarray(dense, dtype=np.float32)
+        max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = max_abs / 127 if max_abs > 0 else 1.0
+        codes = np.round(vector / scale).clip(-127, 127).astype(np.int8)
+        return cls(
+            codes=codes,
+            scale=scale,
+            sparse_indices=np.fromiter(
+                sparse.keys(), dtype=np.int32, count=len(sparse)
+            ),
+            sparse_values=np.fromiter(
+                sparse.values(), dtype=np.float32, count=len(sparse)
+            ),
+        )
+
+    @property
+    def dense(self) -> list[float]:
+        """Dequantized dense vector."""
+        values: list[float] = (self.codes.astype(np.float32) * self.scale).tolist()
+        return values
 
-    dense: list[float]
-    sparse: dict[int, float]
+    @property
+    def sparse(self) -> dict[int, float]:
+        """Sparse vector as token id -> weight."""
+        return dict(zip(self.sparse_indices.tolist(), self.sparse_values.tolist()))
 
 
 class EmbeddingCache:
@@ -19,7 +74,8 @@ class EmbeddingCache:
     LRU cache for query embeddings.
 
     Caches embedding results to avoid re-computing vectors for identical queries.
-    Uses OrderedDict for O(1) access with LRU eviction.
+    Uses OrderedDict for O(1) access with LRU eviction; CPython's OrderedDict
+    is implemented in C, so each hit is one lookup plus a linked-list splice.
     """
 
     def __init__(self, max_size: int = 1000) -> None:
@@ -30,22 +86,30 @@ class EmbeddingCache:
             max_size: Maximum number of entries to cache
         """
         self.max_size = max_size
-        self._cache: OrderedDict[str, CachedEmbedding] = OrderedDict()
+        self._cache: OrderedDict[str | bytes, CachedEmbedding] = OrderedDict()
         self._hits = 0
         self._misses = 0
 
-    def _make_key(self, query: str) -> str:
+    def make_key(self, query: str) -> str | bytes:
         """
         Create cache key from query text.
 
+        Short queries are used as-is, since the dict hashes them anyway;
+        long ones are replaced by a BLAKE2b digest so each entry's key stays
+        small no matter how long the query was. Callers that look up and
+        then store the same query can compute this once and use the
+        *_by_key methods.
+
         Args:
             query: Query text
 
         Returns:
-            MD5 hash of normalized query
+            Normalized query, or a 16-byte digest of it if it is long
         """
         normalized = query.strip().lower()
-        return hashlib.md5(normalized.encode()).hexdigest()
+        if len(normalized) <= MAX_RAW_KEY_LENGTH:
+            return normalized
+        return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
 
     def get(self, query: str) -> CachedEmbedding | None:
         """
@@ -57,15 +121,27 @@ class EmbeddingCache:
         Returns:
             CachedEmbedding if found, None otherwise
         """
-        key = self._make_key(query)
+        return self.get_by_key(self.make_key(query))
+
+    def get_by_key(self, key: str | bytes) -> CachedEmbedding | None:
+        """
+        Retrieve cached embedding for a key from make_key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            CachedEmbedding if found, None otherwise
+        """
+        entry = self._cache.get(key)
 
-        if key in self._cache:
-            self._cache.move_to_end(key)
-            self._hits += 1
-            return self._cache[key]
+        if entry is None:
+            self._misses += 1
+            return None
 
-        self._misses += 1
-        return None
+        self._cache.move_to_end(key)
+        self._hits += 1
+        return entry
 
     def put(self, query: str, dense: list[float], sparse: dict[int, float]) -> None:
         """
@@ -76,16 +152,23 @@ class EmbeddingCache:
             dense: Dense embedding vector
             sparse: Sparse embedding vector
         """
-        key = self._make_key(query)
+        self.put_by_key(self.make_key(query), dense, sparse)
 
-        if key in self._cache:
-            self._cache.move_to_end(key)
-            self._cache[key] = CachedEmbedding(dense=dense, sparse=sparse)
-        else:
-            if len(self._cache) >= self.max_size:
-                self._cache.popitem(last=False)
+    def put_by_key(
+        self, key: str | bytes, dense: list[float], sparse: dict[int, float]
+    ) -> None:
+        """
+        Store embedding in cache under a key from make_key.
 
-            self._cache[key] = CachedEmbedding(dense=dense, sparse=sparse)
+        Args:
+            key: Cache key
+            dense: Dense embedding vector
+            sparse: Sparse embedding vector
+        """
+        self._cache[key] = CachedEmbedding.from_dense(dense, sparse)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
 
     def clear(self) -> None:
         """Clear all cached entries."""
@@ -1,20 +1,56 @@
 """RAG orchestrator coordinating retrieval, reranking, and generation."""
 
+import asyncio
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, AsyncGenerator, Optional
 
 from ..config import settings
-from ..database.qdrant_client import QdrantDB
+from ..database.qdrant_client import QdrantDB, get_qdrant_db
 from ..models.model_factory import ModelFactory, OpenAIProvider
 from ..services.ml_api_client import MLAPIClient
 from .cache import EmbeddingCache
 
 HYBRID_SEARCH_LIMIT = 30
 RERANK_TOP_K = 5
+NO_RESULTS_MESSAGE = "I couldn't find any relevant information in the documents."
 
+SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on the provided context.
 
-@dataclass
+RULES:
+1. Answer ONLY using information from the provided context.
+2. If the context doesn't contain the answer, say "I don't have information about that in the provided documents."
+3. Cite your sources using [Source N] notation.
+4. Be concise and direct.
+5. Use markdown formatting for readability."""
+
+CONTEXT_TEMPLATE = "[Source {i}: {file_name} > {header_path}]\n{content}\n"
+
+SUMMARY_MAX_CHARS = 10000
+
+
+@lru_cache(maxsize=64)
+def _read_summary_input(path: str, mtime_ns: int) -> str:
+    """
+    Read the start of a document for summarization.
+
+    mtime_ns is part of the cache key, so a modified file is re-read. Only
+    the characters the prompt uses are read and decoded, however large the
+    file is.
+
+    Args:
+        path: Document path
+        mtime_ns: Modification time of the document
+
+    Returns:
+        Up to SUMMARY_MAX_CHARS characters of the document
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read(SUMMARY_MAX_CHARS)
+
+
+@dataclass(slots=True)
 class RetrievedContext:
     """Retrieved context with metadata."""
 
@@ -25,7 +61,7 @@ class RetrievedContext:
     relevance_score: float
 
 
-@dataclass
+@dataclass(slots=True)
 class RAGResponse:
     """Complete RAG response with answer and sources."""
 
@@ -52,7 +88,7 @@ class RAGOrchestrator:
             llm_provider: LLM provider for generation
             embedding_cache: Cache for query embeddings
         """
-        self.db = db or QdrantDB()
+        self.db = db or get_qdrant_db()
         self.ml_client = ml_client or MLAPIClient()
         self.embedding_cache = embedding_cache or EmbeddingCache(
             max_size=settings.embedding_cache_size
@@ -79,66 +115,21 @@ class RAGOrchestrator:
         Yields:
             Response tokens from LLM
         """
-        # Step 1: Get query embedding (with caching)
-        query_vectors = await self._get_query_embedding(user_query)
-
-        # Step 2: Hybrid search
-        search_results = self.db.hybrid_search(
-            query_dense=query_vectors["dense"],
-            query_sparse=query_vectors["sparse"],
-            limit=HYBRID_SEARCH_LIMIT,
-        )
+        contexts = await self._retrieve(user_query)
 
-        if not search_results:
-            yield "I couldn't find any relevant information in the documents."
+        if not contexts:
+            yield NO_RESULTS_MESSAGE
             return
 
-        # Step 3: Rerank
-        documents = [r["content"] for r in search_results]
-        reranked = await self.ml_client.rerank(
-            query=user_query,
-            documents=documents,
-            top_k=RERANK_TOP_K * 2,
-        )
-
-        # Step 4: Get parent contexts (deduplicated)
-        parent_ids = []
-        seen_parents: set[str] = set()
-        for idx, score in reranked[:RERANK_TOP_K]:
-            parent_id = search_results[idx]["parent_id"]
-            if parent_id not in seen_parents:
-                parent_ids.append(parent_id)
-                seen_parents.add(parent_id)
-
-        parents = self.db.get_parents(parent_ids)
-
-        # Build context objects
-        contexts = []
-        for parent in parents:
-            best_score = 0.0
-            for idx, score in reranked:
-                if search_results[idx]["parent_id"] == parent["id"]:
-                    best_score = max(best_score, score)
-                    break
-
-            contexts.append(
-                RetrievedContext(
-                    parent_id=parent["id"],
-                    parent_content=parent["content"],
-                    file_name=parent["file_name"],
-                    header_path=parent["header_path"],
-                    relevance_score=best_score,
-                )
-            )
-
         # Step 5: Generate response
         async for token in self._generate(user_query, contexts, chat_history):
             yield token
 
-        # Append source references
-        yield "\n\n---\n**Sources:**\n"
-        for i, ctx in enumerate(contexts, 1):
-            yield f"- [{i}] {ctx.file_name} > {ctx.header_path}\n"
+        # Append source references as a single chunk
+        yield "\n\n---\n**Sources:**\n" + "".join(
+            f"- [{i}] {ctx.file_name} > {ctx.header_path}\n"
+            for i, ctx in enumerate(contexts, 1)
+        )
 
     async def query_with_sources(
         self,
@@ -155,23 +146,72 @@ class RAGOrchestrator:
         Returns:
             RAGResponse with answer and sources
         """
-        answer_parts = []
-        sources: list[RetrievedContext] = []
-
-        async for token in self.query(user_query, chat_history):
-            if token.startswith("\n\n---\n**Sources"):
-                # Parse sources after this marker
-                continue
-            if token.startswith("- ["):
-                # Skip source lines in answer
-                continue
-            answer_parts.append(token)
-
-        return RAGResponse(
-            answer="".join(answer_parts).rstrip(),
-            sources=sources,
+        contexts = await self._retrieve(user_query)
+
+        if not contexts:
+            return RAGResponse(answer=NO_RESULTS_MESSAGE, sources=[])
+
+        answer = "".join(
+            [
+                token
+                async for token in self._generate(user_query, contexts, chat_history)
+            ]
+        )
+
+        return RAGResponse(answer=answer.rstrip(), sources=contexts)
+
+    async def _retrieve(self, user_query: str) -> list[RetrievedContext]:
+        """
+        Retrieve and rerank parent contexts for a query.
+
+        Args:
+            user_query: User's question
+
+        Returns:
+            Deduplicated parent contexts, empty if nothing matched
+        """
+        # Step 1: Get query embedding (with caching)
+        query_vectors = await self._get_query_embedding(user_query)
+
+        # Step 2: Hybrid search (the Qdrant client is synchronous, so keep it
+        # off the event loop that serves other users)
+        search_results = await asyncio.to_thread(
+            self.db.hybrid_search,
+            query_dense=query_vectors["dense"],
+            query_sparse=query_vectors["sparse"],
+            limit=HYBRID_SEARCH_LIMIT,
+        )
+
+        if not search_results:
+            return []
+
+        # Step 3: Rerank
+        documents = [r["content"] for r in search_results]
+        reranked = await self.ml_client.rerank(
+            query=user_query,
+            documents=documents,
+            top_k=RERANK_TOP_K * 2,
         )
 
+        # Step 4: Get parent contexts (deduplicated). Reranked results are
+        # sorted by score, so a parent's first hit is its best score.
+        parent_scores: dict[str, float] = {}
+        for idx, score in reranked[:RERANK_TOP_K]:
+            parent_scores.setdefault(search_results[idx]["parent_id"], max(score, 0.0))
+
+        parents = await asyncio.to_thread(self.db.get_parents, list(parent_scores))
+
+        return [
+            RetrievedContext(
+                parent_id=parent["id"],
+                parent_content=parent["content"],
+                file_name=parent["file_name"],
+                header_path=parent["header_path"],
+                relevance_score=parent_scores[parent["id"]],
+            )
+            for parent in parents
+        ]
+
     async def summarize(self, file_name: str) -> AsyncGenerator[str, None]:
         """
         Generate a summary of a document file.
@@ -190,8 +230,9 @@ class RAGOrchestrator:
         content = None
         for path in search_paths:
             if path.exists():
-                with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
+                content = await asyncio.to_thread(
+                    _read_summary_input, str(path), path.stat().st_mtime_ns
+                )
                 break
 
         if not content:
@@ -205,7 +246,7 @@ class RAGOrchestrator:
             },
             {
                 "role": "user",
-                "content": f"Please summarize this document: {file_name}.\n\nCONTENT:\n{content[:10000]}",
+                "content": f"Please summarize this document: {file_name}.\n\nCONTENT:\n{content}",
             },
         ]
 
@@ -225,8 +266,9 @@ class RAGOrchestrator:
         Returns:
             Dict with 'dense' and 'sparse' vectors
         """
-        # Check cache first
-        cached = self.embedding_cache.get(query)
+        # Check cache first, normalizing the query once for both lookup and store
+        key = self.embedding_cache.make_key(query)
+        cached = self.embedding_cache.get_by_key(key)
         if cached is not None:
             return {"dense": cached.dense, "sparse": cached.sparse}
 
@@ -234,7 +276,7 @@ class RAGOrchestrator:
         result = await self.ml_client.embed_single(query, is_query=True)
 
         # Cache it
-        self.embedding_cache.put(query, result["dense"], result["sparse"])
+        self.embedding_cache.put_by_key(key, result["dense"], result["sparse"])
 
         return result
 
@@ -256,26 +298,18 @@ class RAGOrchestrator:
             Response tokens from LLM
         """
         # Build context string
-        context_parts = []
-        for i, ctx in enumerate(contexts, 1):
-            context_parts.append(
-                f"[Source {i}: {ctx.file_name} > {ctx.header_path}]\n"
-                f"{ctx.parent_content}\n"
+        context_str = "\n---\n".join(
+            CONTEXT_TEMPLATE.format(
+                i=i,
+                file_name=ctx.file_name,
+                header_path=ctx.header_path,
+                content=ctx.parent_content,
             )
-        context_str = "\n---\n".join(context_parts)
-
-        # System prompt
-        system_prompt = """You are a helpful assistant that answers questions based on the provided context.
-
-RULES:
-1. Answer ONLY using information from the provided context.
-2. If the context doesn't contain the answer, say "I don't have information about that in the provided documents."
-3. Cite your sources using [Source N] notation.
-4. Be concise and direct.
-5. Use markdown formatting for readability."""
+            for i, ctx in enumerate(contexts, 1)
+        )
 
         # Build messages
-        messages = [{"role": "system", "content": system_prompt}]
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
         if chat_history:
             messages.extend(chat_history[-6:])  # Last 3 turns
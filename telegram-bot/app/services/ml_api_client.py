@@ -1,11 +1,51 @@
 """ML API client for embeddings and reranking."""
 
+import base64
 from typing import Any
 
 import httpx
+import msgpack
+import numpy as np
+import orjson
 
 from ..config import settings
 
+# Keep idle connections longer than httpx's 5 s default so sparse chat
+# traffic reuses them; the ML API's keep-alive timeout is set above this
+POOL_LIMITS = httpx.Limits(
+    max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0
+)
+
+
+def decode_dense_vectors(encoded: list[str]) -> np.ndarray:
+    """
+    Decode dense vectors from the ML API wire format.
+
+    Args:
+        encoded: Base64-encoded little-endian float16 bytes, one per vector
+
+    Returns:
+        float32 array of shape (len(encoded), dim)
+    """
+    raw = b"".join(base64.b64decode(vector) for vector in encoded)
+    vectors = np.frombuffer(raw, dtype="<f2").reshape(len(encoded), -1)
+    return vectors.astype(np.float32)
+
+
+def decode_sparse_vector(sparse: dict[str, float]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a sparse vector from the ML API wire format to parallel arrays.
+
+    Args:
+        sparse: Token id (as a JSON string key) -> weight
+
+    Returns:
+        Tuple of (int32 indices, float32 values)
+    """
+    indices = np.fromiter(sparse.keys(), dtype=np.int32, count=len(sparse))
+    values = np.fromiter(sparse.values(), dtype=np.float32, count=len(sparse))
+    return indices, values
+
 
 class MLAPIClient:
     """Client for the ML API service (embeddings + reranking)."""
@@ -27,7 +67,9 @@ class MLAPIClient:
     async def _get_client(self) -> httpx.AsyncClient:
         """Get or create the async HTTP client."""
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=self.timeout)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=POOL_LIMITS
+            )
         return self._client
 
     async def close(self) -> None:
@@ -36,9 +78,7 @@ class MLAPIClient:
             await self._client.aclose()
             self._client = None
 
-    async def embed(
-        self, texts: list[str], is_query: bool = False
-    ) -> dict[str, list[Any]]:
+    async def embed(self, texts: list[str], is_query: bool = False) -> dict[str, Any]:
         """
         Generate embeddings for texts.
 
@@ -47,18 +87,27 @@ class MLAPIClient:
             is_query: Whether these are query texts (affects embedding)
 
         Returns:
-            Dict with 'dense_vecs' and 'sparse_vecs' lists
+            Dict with 'dense_vecs' (float32 array, one row per text) and
+            'sparse_vecs' list of (indices, values) array pairs
         """
         client = await self._get_client()
 
+        # MessagePack frames each text as length + raw UTF-8, with no JSON
+        # string escaping; the API accepts it alongside JSON
         response = await client.post(
-            f"{self.base_url}/embed",
-            json={"text": texts, "is_query": is_query},
+            "/embed",
+            content=msgpack.packb({"text": texts, "is_query": is_query}),
+            headers={"Content-Type": "application/msgpack"},
         )
 
         response.raise_for_status()
-        result: dict[str, list[Any]] = response.json()
-        return result
+        # NDJSON: one {"dense", "sparse"} object per input text, in order
+        # orjson parses the raw bytes, skipping the str decode of the body
+        rows = [orjson.loads(line) for line in response.content.splitlines() if line]
+        return {
+            "dense_vecs": decode_dense_vectors([row["dense"] for row in rows]),
+            "sparse_vecs": [decode_sparse_vector(row["sparse"]) for row in rows],
+        }
 
     async def embed_single(self, text: str, is_query: bool = False) -> dict[str, Any]:
         """
@@ -72,9 +121,10 @@ class MLAPIClient:
             Dict with 'dense' and 'sparse' vectors
         """
         result = await self.embed([text], is_query=is_query)
+        indices, values = result["sparse_vecs"][0]
         return {
-            "dense": result["dense_vecs"][0],
-            "sparse": result["sparse_vecs"][0],
+            "dense": result["dense_vecs"][0].tolist(),
+            "sparse": dict(zip(indices.tolist(), values.tolist())),
         }
 
     async def rerank(
@@ -94,16 +144,19 @@ class MLAPIClient:
         client = await self._get_client()
 
         response = await client.post(
-            f"{self.base_url}/rerank",
-            json={
-                "query": query,
-                "documents": documents,
-                "top_k": top_k,
-            },
+            "/rerank",
+            content=orjson.dumps(
+                {
+                    "query": query,
+                    "documents": documents,
+                    "top_k": top_k,
+                }
+            ),
+            headers={"Content-Type": "application/json"},
         )
 
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         return [(r["index"], r["score"]) for r in data["results"]]
 
@@ -116,7 +169,7 @@ class MLAPIClient:
         """
         try:
             client = await self._get_client()
-            response = await client.get(f"{self.base_url}/health")
+            response = await client.get("/health")
             return response.status_code == 200
         except Exception:
             return False
@@ -0,0 +1,26 @@
+"""File hashing helpers."""
+
+import hashlib
+from pathlib import Path
+
+HASH_READ_SIZE = 1 << 16  # 64 KB
+
+
+def sha256_file(path: Path) -> str:
+    """
+    Compute the SHA-256 of a file without loading it into memory.
+
+    hashlib's sha256 is backed by OpenSSL, which uses the CPU's SHA
+    extensions (SHA-NI / ARMv8 crypto) when available.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
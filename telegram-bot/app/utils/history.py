@@ -1,26 +1,30 @@
 """Conversation history manager for Telegram users."""
 
-from collections import defaultdict
+import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
-from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A single message in conversation history."""
 
     role: str  # "user" or "assistant"
     content: str
-    timestamp: datetime = field(default_factory=datetime.utcnow)
+    timestamp: int = field(default_factory=time.time_ns)  # Unix time in ns
 
 
-@dataclass
+@dataclass(slots=True)
 class Conversation:
     """Conversation history for a single user."""
 
-    messages: list[Message] = field(default_factory=list)
+    messages: deque[Message] = field(default_factory=deque)
     max_turns: int = 3
 
+    def __post_init__(self) -> None:
+        """Bound messages so appends drop the oldest turn automatically."""
+        self.messages = deque(self.messages, maxlen=self.max_turns * 2)
+
     def add_message(self, role: str, content: str) -> None:
         """
         Add a message to the conversation.
@@ -31,10 +35,6 @@ class Conversation:
         """
         self.messages.append(Message(role=role, content=content))
 
-        max_messages = self.max_turns * 2
-        if len(self.messages) > max_messages:
-            self.messages = self.messages[-max_messages:]
-
     def get_history(self) -> list[dict[str, str]]:
         """
         Get conversation history in OpenAI message format.
@@ -57,17 +57,38 @@ class HistoryManager:
     For production, consider persisting to Redis or a database.
     """
 
-    def __init__(self, max_turns: int = 3) -> None:
+    def __init__(self, max_turns: int = 3, max_users: int = 10_000) -> None:
         """
         Initialize history manager.
 
         Args:
             max_turns: Maximum conversation turns to maintain per user
+            max_users: Maximum users to keep history for; the least recently
+                active user's history is dropped beyond this
         """
         self.max_turns = max_turns
-        self._conversations: dict[int, Conversation] = defaultdict(
-            lambda: Conversation(max_turns=self.max_turns)
-        )
+        self.max_users = max_users
+        self._conversations: OrderedDict[int, Conversation] = OrderedDict()
+
+    def _touch(self, user_id: int) -> Conversation:
+        """
+        Get a user's conversation, creating it if needed, and mark it recent.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            The user's conversation
+        """
+        conversation = self._conversations.get(user_id)
+        if conversation is None:
+            conversation = Conversation(max_turns=self.max_turns)
+            self._conversations[user_id] = conversation
+            if len(self._conversations) > self.max_users:
+                self._conversations.popitem(last=False)
+        else:
+            self._conversations.move_to_end(user_id)
+        return conversation
 
     def add_user_message(self, user_id: int, content: str) -> None:
         """
@@ -77,7 +98,7 @@ class HistoryManager:
             user_id: Telegram user ID
             content: Message content
         """
-        self._conversations[user_id].add_message("user", content)
+        self._touch(user_id).add_message("user", content)
 
     def add_assistant_message(self, user_id: int, content: str) -> None:
         """
@@ -87,7 +108,7 @@ class HistoryManager:
             user_id: Telegram user ID
             content: Message content
         """
-        self._conversations[user_id].add_message("assistant", content)
+        self._touch(user_id).add_message("assistant", content)
 
     def get_history(self, user_id: int) -> list[dict[str, str]]:
         """
@@ -99,7 +120,7 @@ class HistoryManager:
         Returns:
             List of message dicts in OpenAI format
         """
-        return self._conversations[user_id].get_history()
+        return self._touch(user_id).get_history()
 
     def clear_history(self, user_id: int) -> None:
         """
@@ -108,7 +129,7 @@ class HistoryManager:
         Args:
             user_id: Telegram user ID
         """
-        self._conversations[user_id].clear()
+        self._touch(user_id).clear()
 
     def clear_all(self) -> None:
         """Clear all conversation histories."""
@@ -0,0 +1,74 @@
+"""On-disk cache of extracted document markdown."""
+
+import os
+from pathlib import Path
+
+
+class MarkdownCache:
+    """
+    Disk cache of MarkItDown output keyed by file hash.
+
+    Re-ingesting a file whose vectors were deleted skips the conversion step,
+    which for PDFs can take seconds. Entries are evicted least recently used
+    first once the directory grows past max_bytes; reads refresh an entry's
+    mtime, so eviction does not depend on atime being tracked.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int) -> None:
+        """
+        Initialize markdown cache.
+
+        Args:
+            cache_dir: Directory holding one <file_hash>.md per entry
+            max_bytes: Total size at which the oldest entries are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, file_hash: str) -> Path:
+        """Get the cache file path for a file hash."""
+        return self.cache_dir / f"{file_hash}.md"
+
+    def get(self, file_hash: str) -> str | None:
+        """
+        Retrieve cached markdown for a file.
+
+        Args:
+            file_hash: SHA256 hash of the source file
+
+        Returns:
+            Cached markdown if found, None otherwise
+        """
+        path = self._path(file_hash)
+        try:
+            content = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return content
+
+    def put(self, file_hash: str, content: str) -> None:
+        """
+        Store markdown for a file and evict old entries if over budget.
+
+        Args:
+            file_hash: SHA256 hash of the source file
+            content: Extracted markdown
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._path(file_hash).write_text(content, encoding="utf-8")
+        self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under max_bytes."""
+        entries = [(path, path.stat()) for path in self.cache_dir.glob("*.md")]
+        total = sum(stat.st_size for _, stat in entries)
+        if total <= self.max_bytes:
+            return
+
+        entries.sort(key=lambda entry: entry[1].st_mtime)
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
@@ -1,15 +1,18 @@
 """Pytest configuration and fixtures."""
 
 import os
+from collections.abc import Iterable
 from unittest.mock import patch
 
 import pytest
 
+from app.utils.history import HistoryManager
 
-@pytest.fixture(autouse=True)
-def mock_env_vars():
-    """Set up test environment variables."""
-    env_vars = {
+
+@pytest.fixture(scope="session")
+def test_env_vars():
+    """Environment variables every test runs with."""
+    return {
         "TELEGRAM_TOKEN": "test-token-12345",
         "OPENAI_API_KEY": "test-openai-key",
         "QDRANT_URL": "http://localhost:6333",
@@ -17,7 +20,46 @@ def mock_env_vars():
         "EMBEDDING_CACHE_SIZE": "500",
         "MAX_HISTORY_TURNS": "5",
     }
-    with patch.dict(os.environ, env_vars, clear=False):
+
+
+class TokenStream:
+    """Async iterator over a fixed sequence of tokens."""
+
+    __slots__ = ("_tokens",)
+
+    def __init__(self, tokens: Iterable[str]) -> None:
+        self._tokens = iter(tokens)
+
+    def __aiter__(self) -> "TokenStream":
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return next(self._tokens)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+@pytest.fixture(scope="session")
+def token_stream():
+    """Build stand-ins for streaming methods that replay fixed tokens."""
+
+    def make_stream(*tokens: str):
+        return lambda *args, **kwargs: TokenStream(tokens)
+
+    return make_stream
+
+
+@pytest.fixture
+def history_manager(request):
+    """History manager; parametrize indirectly to choose max_turns (default 3)."""
+    return HistoryManager(max_turns=getattr(request, "param", 3))
+
+
+@pytest.fixture(autouse=True)
+def mock_env_vars(test_env_vars):
+    """Set up test environment variables."""
+    with patch.dict(os.environ, test_env_vars, clear=False):
         yield
 
 
@@ -1,5 +1,6 @@
 """Tests for embedding cache."""
 
+import numpy as np
 import pytest
 
 from app.rag.cache import EmbeddingCache
@@ -26,8 +27,22 @@ class TestEmbeddingCache:
         result = cache.get("test query")
 
         assert result is not None
-        assert result.dense == dense
-        assert result.sparse == sparse
+        assert result.dense == pytest.approx(dense, abs=1e-3)
+        assert result.sparse == pytest.approx(sparse)
+
+    def test_dense_is_stored_as_int8(self):
+        """Verify dense vectors are quantized and round-trip within one step."""
+        cache = EmbeddingCache()
+        dense = [0.5, -1.0, 0.25, 0.0]
+
+        cache.put("query", dense, {})
+        result = cache.get("query")
+
+        assert result is not None
+        assert result.codes.dtype == np.int8
+        assert result.sparse_indices.dtype == np.int32
+        assert result.sparse_values.dtype == np.float32
+        assert result.dense == pytest.approx(dense, abs=result.scale)
 
     def test_get_nonexistent_returns_none(self):
         """Verify get returns None for missing keys."""
@@ -55,6 +70,26 @@ class TestEmbeddingCache:
 
         assert result is not None
 
+    def test_long_queries_are_keyed_by_digest(self):
+        """Verify long queries get a fixed-size key but still normalize."""
+        cache = EmbeddingCache()
+        query = "What does the policy say about " + "remote work " * 20
+
+        cache.put(query.upper(), [0.1], {})
+
+        assert all(len(key) == 16 for key in cache._cache)
+        assert cache.get(f"  {query}  ") is not None
+
+    def test_by_key_methods_share_entries_with_query_methods(self):
+        """Verify a precomputed key reaches the same entry as the raw query."""
+        cache = EmbeddingCache()
+        key = cache.make_key("  Test Query ")
+
+        cache.put_by_key(key, [0.1], {1: 0.5})
+
+        assert cache.get("test query") is not None
+        assert cache.get_by_key(key) is not None
+
     def test_lru_eviction(self):
         """Verify LRU eviction when max size is reached."""
         cache = EmbeddingCache(max_size=3)
@@ -84,8 +119,8 @@ class TestEmbeddingCache:
         result = cache.get("query")
 
         assert result is not None
-        assert result.dense == [0.2]
-        assert result.sparse == {2: 0.6}
+        assert result.dense == pytest.approx([0.2])
+        assert result.sparse == pytest.approx({2: 0.6})
 
     def test_clear_removes_all_entries(self):
         """Verify clear removes all cached entries."""
@@ -1,8 +1,11 @@
 """Tests for the chunking engine."""
 
+from unittest.mock import MagicMock, patch
+
 import pytest
 
 from app.chunking import ChildChunk, ChunkingEngine, ParentChunk
+from app.chunking.engine import _get_tokenizer
 
 
 @pytest.fixture
@@ -79,6 +82,19 @@ class TestChunkingEngine:
             assert child.file_name == "test.md"
             assert child.chunk_index >= 0
 
+    def test_child_content_is_sliced_from_parent(
+        self, chunking_engine, sample_markdown_content
+    ):
+        """Verify child chunks are verbatim substrings of their parent."""
+        parents, children = chunking_engine.chunk_document(
+            sample_markdown_content, "hash123", "test.md"
+        )
+
+        parents_by_id = {p.id: p for p in parents}
+
+        for child in children:
+            assert child.content in parents_by_id[child.parent_id].content
+
     def test_parent_chunk_ids_are_deterministic(self, chunking_engine):
         """Verify same content produces same chunk IDs."""
         content = "# Test\n\nSome content here for testing purposes."
@@ -183,3 +199,23 @@ def hello():
 
         assert len(parents) >= 1
         assert "bold" in parents[0].content or "code" in parents[0].content
+
+    def test_large_section_split_keeps_sentence_text(self, chunking_engine):
+        """Verify split parents are built from the section's own sentences."""
+        sentence = "The quick brown fox jumps over the lazy dog near the river bank."
+        content = "# Long\n\n" + " ".join([sentence] * 60)
+
+        parents, _ = chunking_engine.chunk_document(content, "hash", "long.md")
+
+        assert len(parents) > 1
+        assert all(p.content.endswith("river bank.") for p in parents)
+        assert all(p.content.startswith("The quick") for p in parents[1:])
+
+    def test_rejects_slow_tokenizer(self):
+        """Verify loading fails instead of falling back to a slow tokenizer."""
+        with patch(
+            "app.chunking.engine.AutoTokenizer.from_pretrained",
+            return_value=MagicMock(),
+        ):
+            with pytest.raises(RuntimeError, match="fast tokenizer"):
+                _get_tokenizer.__wrapped__("slow/tokenizer")
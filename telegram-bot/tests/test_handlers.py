@@ -3,44 +3,67 @@
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from telegram.error import BadRequest
 
-from app.handlers.ask import ask_command, clear_command, stats_command
-from app.handlers.help import help_command, start_command
-from app.utils.history import HistoryManager
+from app.handlers.ask import (
+    ask_command,
+    clear_command,
+    safe_reply,
+    split_message,
+    stats_command,
+)
+from app.handlers.help import HELP_TEXT, help_command, start_command
 
+TEST_USER_ID = 12345
 
-@pytest.fixture
-def mock_update():
-    """Create mock Telegram Update object."""
+
+async def send_action_noop(*args, **kwargs):
+    """Stand-in for chat.send_action in tests that do not assert on it."""
+
+
+@pytest.fixture(scope="module")
+def shared_update():
+    """Build the mock Telegram Update object once per module."""
     update = MagicMock()
     update.message = MagicMock()
     update.message.reply_text = AsyncMock()
     update.message.chat = MagicMock()
-    update.message.chat.send_action = AsyncMock()
+    update.message.chat.send_action = send_action_noop
     update.effective_user = MagicMock()
-    update.effective_user.id = 12345
+    update.effective_user.id = TEST_USER_ID
     return update
 
 
 @pytest.fixture
-def mock_context():
-    """Create mock Telegram Context object."""
-    context = MagicMock()
-    context.args = []
-    return context
+def mock_update(shared_update):
+    """Mock Telegram Update object with call records cleared."""
+    shared_update.reset_mock()
+    return shared_update
+
+
+@pytest.fixture(scope="module")
+def shared_context():
+    """Build the mock Telegram Context object once per module."""
+    return MagicMock()
 
 
 @pytest.fixture
-def mock_orchestrator():
-    """Create mock RAG orchestrator."""
-    orchestrator = MagicMock()
+def mock_context(shared_context):
+    """Mock Telegram Context object with no command arguments."""
+    shared_context.reset_mock()
+    shared_context.args = []
+    return shared_context
 
-    async def mock_query(*args, **kwargs):
-        yield "Test response"
-        yield "\n\n---\n**Sources:**\n"
-        yield "- [1] test.md > Section\n"
 
-    orchestrator.query = mock_query
+@pytest.fixture(scope="module")
+def mock_orchestrator(token_stream):
+    """Create mock RAG orchestrator; it is stateless, so tests share it."""
+    orchestrator = MagicMock()
+    orchestrator.query = token_stream(
+        "Test response",
+        "\n\n---\n**Sources:**\n",
+        "- [1] test.md > Section\n",
+    )
     orchestrator.get_cache_stats.return_value = {
         "size": 10,
         "max_size": 100,
@@ -51,12 +74,6 @@ def mock_orchestrator():
     return orchestrator
 
 
-@pytest.fixture
-def history_manager():
-    """Create history manager for testing."""
-    return HistoryManager(max_turns=3)
-
-
 class TestHelpCommand:
     """Test suite for help command."""
 
@@ -67,7 +84,7 @@ class TestHelpCommand:
 
         mock_update.message.reply_text.assert_called_once()
         call_args = mock_update.message.reply_text.call_args
-        assert "DocuRAG Bot" in call_args[0][0]
+        assert call_args[0][0] is HELP_TEXT
 
     @pytest.mark.asyncio
     async def test_help_command_handles_no_message(self, mock_context):
@@ -105,10 +122,11 @@ class TestAskCommand:
 
     @pytest.mark.asyncio
     async def test_ask_command_sends_response(
-        self, mock_update, mock_context, mock_orchestrator, history_manager
+        self, mock_update, mock_context, mock_orchestrator, history_manager, monkeypatch
     ):
         """Verify ask command sends RAG response."""
         mock_context.args = ["What", "is", "the", "policy"]
+        monkeypatch.setattr(mock_update.message.chat, "send_action", AsyncMock())
 
         await ask_command(mock_update, mock_context, mock_orchestrator, history_manager)
 
@@ -124,11 +142,10 @@ class TestAskCommand:
     ):
         """Verify ask command updates conversation history."""
         mock_context.args = ["test", "query"]
-        user_id = mock_update.effective_user.id
 
         await ask_command(mock_update, mock_context, mock_orchestrator, history_manager)
 
-        history = history_manager.get_history(user_id)
+        history = history_manager.get_history(TEST_USER_ID)
         assert len(history) == 2  # user + assistant
         assert history[0]["role"] == "user"
         assert "test query" in history[0]["content"]
@@ -142,12 +159,11 @@ class TestClearCommand:
         self, mock_update, mock_context, history_manager
     ):
         """Verify clear command clears user history."""
-        user_id = mock_update.effective_user.id
-        history_manager.add_user_message(user_id, "test")
+        history_manager.add_user_message(TEST_USER_ID, "test")
 
         await clear_command(mock_update, mock_context, history_manager)
 
-        assert len(history_manager.get_history(user_id)) == 0
+        assert len(history_manager.get_history(TEST_USER_ID)) == 0
 
     @pytest.mark.asyncio
     async def test_clear_command_sends_confirmation(
@@ -192,3 +208,49 @@ class TestStatsCommand:
         response = call_args[0][0]
         assert "Conversation History" in response
         assert "Active Users" in response
+
+
+class TestSplitMessage:
+    """Test suite for splitting long responses."""
+
+    def test_split_message_keeps_lines_whole(self):
+        """Verify chunks break at line boundaries and respect the limit."""
+        text = "".join(f"line {i:03d} **bold**\n" for i in range(100))
+
+        chunks = split_message(text, limit=100)
+
+        assert "".join(chunks) == text
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert all(chunk.endswith("\n") for chunk in chunks)
+
+    def test_split_message_splits_overlong_line(self):
+        """Verify a single line longer than the limit is still split."""
+        chunks = split_message("x" * 250, limit=100)
+
+        assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+
+
+class TestSafeReply:
+    """Test suite for the Markdown fallback reply."""
+
+    @pytest.mark.asyncio
+    async def test_safe_reply_falls_back_to_plain_text(self):
+        """Verify entity parse errors resend the text without Markdown."""
+        message = MagicMock()
+        message.reply_text = AsyncMock(
+            side_effect=[BadRequest("Can't parse entities: bad offset"), None]
+        )
+
+        await safe_reply(message, "*broken")
+
+        assert message.reply_text.call_count == 2
+        assert message.reply_text.call_args.kwargs == {}
+
+    @pytest.mark.asyncio
+    async def test_safe_reply_reraises_other_errors(self):
+        """Verify unrelated BadRequest errors are not swallowed."""
+        message = MagicMock()
+        message.reply_text = AsyncMock(side_effect=BadRequest("Chat not found"))
+
+        with pytest.raises(BadRequest):
+            await safe_reply(message, "text")
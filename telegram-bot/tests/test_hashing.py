@@ -0,0 +1,24 @@
+"""Tests for file hashing helpers."""
+
+import hashlib
+
+from app.utils.hashing import HASH_READ_SIZE, sha256_file
+
+
+class TestSha256File:
+    """Test suite for streamed file hashing."""
+
+    def test_matches_whole_file_digest(self, tmp_path):
+        """Verify streamed hashing matches hashing the full contents."""
+        data = b"abc123" * (HASH_READ_SIZE // 3)
+        path = tmp_path / "doc.txt"
+        path.write_bytes(data)
+
+        assert sha256_file(path) == hashlib.sha256(data).hexdigest()
+
+    def test_empty_file(self, tmp_path):
+        """Verify an empty file hashes to the empty digest."""
+        path = tmp_path / "empty.txt"
+        path.write_bytes(b"")
+
+        assert sha256_file(path) == hashlib.sha256(b"").hexdigest()
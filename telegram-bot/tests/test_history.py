@@ -1,15 +1,21 @@
 """Tests for conversation history manager."""
 
+import pytest
+
 from app.utils.history import Conversation, HistoryManager
 
 
+@pytest.fixture
+def conv(request):
+    """Conversation; parametrize indirectly to choose max_turns (default 3)."""
+    return Conversation(max_turns=getattr(request, "param", 3))
+
+
 class TestConversation:
     """Test suite for Conversation dataclass."""
 
-    def test_add_message(self):
+    def test_add_message(self, conv):
         """Verify messages are added correctly."""
-        conv = Conversation(max_turns=3)
-
         conv.add_message("user", "Hello")
         conv.add_message("assistant", "Hi there!")
 
@@ -17,10 +23,9 @@ class TestConversation:
         assert conv.messages[0].role == "user"
         assert conv.messages[0].content == "Hello"
 
-    def test_truncates_old_messages(self):
+    @pytest.mark.parametrize("conv", [2], indirect=True)
+    def test_truncates_old_messages(self, conv):
         """Verify old messages are removed when exceeding max turns."""
-        conv = Conversation(max_turns=2)  # 4 messages max
-
         conv.add_message("user", "msg1")
         conv.add_message("assistant", "resp1")
         conv.add_message("user", "msg2")
@@ -31,10 +36,8 @@ class TestConversation:
         # First message should be "msg2" (msg1 and resp1 evicted)
         assert conv.messages[0].content == "resp1"
 
-    def test_get_history_returns_openai_format(self):
+    def test_get_history_returns_openai_format(self, conv):
         """Verify history is returned in OpenAI message format."""
-        conv = Conversation()
-
         conv.add_message("user", "Hello")
         conv.add_message("assistant", "Hi!")
 
@@ -44,10 +47,8 @@ class TestConversation:
         assert history[0] == {"role": "user", "content": "Hello"}
         assert history[1] == {"role": "assistant", "content": "Hi!"}
 
-    def test_clear_removes_all_messages(self):
+    def test_clear_removes_all_messages(self, conv):
         """Verify clear removes all messages."""
-        conv = Conversation()
-
         conv.add_message("user", "Hello")
         conv.add_message("assistant", "Hi!")
         conv.clear()
@@ -58,80 +59,69 @@ class TestConversation:
 class TestHistoryManager:
     """Test suite for HistoryManager."""
 
-    def test_add_user_message(self):
+    def test_add_user_message(self, history_manager):
         """Verify user messages are added correctly."""
-        manager = HistoryManager(max_turns=3)
+        history_manager.add_user_message(123, "Hello")
 
-        manager.add_user_message(123, "Hello")
-
-        history = manager.get_history(123)
+        history = history_manager.get_history(123)
         assert len(history) == 1
         assert history[0]["role"] == "user"
         assert history[0]["content"] == "Hello"
 
-    def test_add_assistant_message(self):
+    def test_add_assistant_message(self, history_manager):
         """Verify assistant messages are added correctly."""
-        manager = HistoryManager(max_turns=3)
-
-        manager.add_assistant_message(123, "Hi there!")
+        history_manager.add_assistant_message(123, "Hi there!")
 
-        history = manager.get_history(123)
+        history = history_manager.get_history(123)
         assert len(history) == 1
         assert history[0]["role"] == "assistant"
 
-    def test_separate_histories_per_user(self):
+    def test_separate_histories_per_user(self, history_manager):
         """Verify each user has separate history."""
-        manager = HistoryManager()
+        history_manager.add_user_message(123, "Hello from user 123")
+        history_manager.add_user_message(456, "Hello from user 456")
 
-        manager.add_user_message(123, "Hello from user 123")
-        manager.add_user_message(456, "Hello from user 456")
-
-        history_123 = manager.get_history(123)
-        history_456 = manager.get_history(456)
+        history_123 = history_manager.get_history(123)
+        history_456 = history_manager.get_history(456)
 
         assert len(history_123) == 1
         assert len(history_456) == 1
         assert history_123[0]["content"] == "Hello from user 123"
         assert history_456[0]["content"] == "Hello from user 456"
 
-    def test_clear_history_for_user(self):
+    def test_clear_history_for_user(self, history_manager):
         """Verify clearing history for a specific user."""
-        manager = HistoryManager()
-
-        manager.add_user_message(123, "Hello")
-        manager.add_user_message(456, "Hi")
-        manager.clear_history(123)
+        history_manager.add_user_message(123, "Hello")
+        history_manager.add_user_message(456, "Hi")
+        history_manager.clear_history(123)
 
-        assert len(manager.get_history(123)) == 0
-        assert len(manager.get_history(456)) == 1
+        assert len(history_manager.get_history(123)) == 0
+        assert len(history_manager.get_history(456)) == 1
 
-    def test_clear_all_histories(self):
+    def test_clear_all_histories(self, history_manager):
         """Verify clearing all histories."""
-        manager = HistoryManager()
+        history_manager.add_user_message(123, "Hello")
+        history_manager.add_user_message(456, "Hi")
+        history_manager.clear_all()
 
-        manager.add_user_message(123, "Hello")
-        manager.add_user_message(456, "Hi")
-        manager.clear_all()
+        assert history_manager.get_user_count() == 0
 
-        assert manager.get_user_count() == 0
-
-    def test_get_empty_history_for_new_user(self):
+    def test_get_empty_history_for_new_user(self, history_manager):
         """Verify new users get empty history."""
-        manager = HistoryManager()
-
-        history = manager.get_history(999)
+        history = history_manager.get_history(999)
 
         assert history == []
 
-    def test_respects_max_turns(self):
+    @pytest.mark.parametrize("history_manager", [2], indirect=True)
+    def test_respects_max_turns(self, history_manager):
         """Verify history respects max_turns setting."""
-        manager = HistoryManager(max_turns=2)
-
+        add_user = history_manager.add_user_message
+        add_assistant = history_manager.add_assistant_message
         for i in range(5):
-            manager.add_user_message(123, f"msg{i}")
-            manager.add_assistant_message(123, f"resp{i}")
+            add_user(123, f"msg{i}")
+            add_assistant(123, f"resp{i}")
 
-        history = manager.get_history(123)
+        history = history_manager.get_history(123)
 
         # Should only have last 2 turns (4 messages)
         assert len(history) == 4
@@ -140,26 +130,35 @@ class TestHistoryManager:
 class TestHistoryManagerStats:
     """Test suite for history manager statistics."""
 
-    def test_get_stats(self):
+    def test_get_stats(self, history_manager):
         """Verify stats returns expected information."""
-        manager = HistoryManager(max_turns=3)
-
-        manager.add_user_message(123, "Hello")
-        manager.add_assistant_message(123, "Hi")
-        manager.add_user_message(456, "Hey")
+        history_manager.add_user_message(123, "Hello")
+        history_manager.add_assistant_message(123, "Hi")
+        history_manager.add_user_message(456, "Hey")
 
-        stats = manager.get_stats()
+        stats = history_manager.get_stats()
 
         assert stats["user_count"] == 2
         assert stats["total_messages"] == 3
         assert stats["max_turns"] == 3
 
-    def test_user_count(self):
+    def test_user_count(self, history_manager):
         """Verify user count is accurate."""
-        manager = HistoryManager()
+        history_manager.add_user_message(1, "a")
+        history_manager.add_user_message(2, "b")
+        history_manager.add_user_message(3, "c")
+
+        assert history_manager.get_user_count() == 3
+
+    def test_evicts_least_recently_active_user(self):
+        """Verify the oldest user's history is dropped beyond max_users."""
+        manager = HistoryManager(max_users=2)
 
         manager.add_user_message(1, "a")
         manager.add_user_message(2, "b")
+        manager.add_user_message(1, "again")
         manager.add_user_message(3, "c")
 
-        assert manager.get_user_count() == 3
+        assert manager.get_user_count() == 2
+        assert manager.get_history(1)[-1]["content"] == "again"
+        assert manager.get_history(2) == []
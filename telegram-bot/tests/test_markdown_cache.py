@@ -0,0 +1,37 @@
+"""Tests for the on-disk markdown cache."""
+
+import os
+
+from app.utils.markdown_cache import MarkdownCache
+
+
+class TestMarkdownCache:
+    """Test suite for MarkdownCache."""
+
+    def test_put_and_get(self, tmp_path):
+        """Verify stored markdown is returned for the same hash."""
+        cache = MarkdownCache(tmp_path, max_bytes=1024)
+
+        cache.put("hash1", "# Title\n\nBody")
+
+        assert cache.get("hash1") == "# Title\n\nBody"
+
+    def test_get_missing_returns_none(self, tmp_path):
+        """Verify unknown hashes miss."""
+        cache = MarkdownCache(tmp_path, max_bytes=1024)
+
+        assert cache.get("missing") is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Verify the oldest entry is dropped once over budget."""
+        cache = MarkdownCache(tmp_path, max_bytes=25)
+        cache.put("old", "x" * 10)
+        cache.put("recent", "y" * 10)
+        os.utime(tmp_path / "old.md", (0, 0))
+        os.utime(tmp_path / "recent.md", (1, 1))
+
+        cache.put("new", "z" * 10)
+
+        assert cache.get("old") is None
+        assert cache.get("recent") is not None
+        assert cache.get("new") is not None
@@ -1,133 +1,211 @@
 """Tests for ML API client."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 import httpx
+import msgpack
+import numpy as np
 import pytest
+import pytest_asyncio
 
-from app.services.ml_api_client import MLAPIClient
+from app.services.ml_api_client import MLAPIClient, decode_dense_vectors
+
+
+def encode_dense(vector: list[float]) -> str:
+    """Encode a dense vector the way the ML API does (base64 float16)."""
+    return base64.b64encode(np.asarray(vector, dtype="<f2").tobytes()).decode()
+
+
+def embed_ndjson(rows: list[tuple[list[float], dict[str, float]]]) -> bytes:
+    """Build an /embed NDJSON body from (dense, sparse) pairs."""
+    return "".join(
+        json.dumps({"dense": encode_dense(dense), "sparse": sparse}) + "\n"
+        for dense, sparse in rows
+    ).encode()
+
+
+def ok_response(content: bytes) -> SimpleNamespace:
+    """Build a successful httpx-like response with the given body."""
+    return SimpleNamespace(raise_for_status=lambda: None, content=content)
 
 
 @pytest.fixture
-def ml_client():
+def fresh_ml_client():
     """Create ML API client for testing."""
     return MLAPIClient(base_url="http://localhost:8001", timeout=30.0)
 
 
+@pytest_asyncio.fixture(scope="module", loop_scope="session")
+async def ml_client():
+    """
+    ML API client shared by the module's tests.
+
+    Building the underlying httpx.AsyncClient loads an SSL context, so it is
+    created once; tests patch its methods and never touch the network.
+    Tests that close the client use fresh_ml_client instead. Teardown runs
+    on the session loop the tests use, so the client is closed there.
+    """
+    client = MLAPIClient(base_url="http://localhost:8001", timeout=30.0)
+    yield client
+    await client.close()
+
+
+@pytest.fixture(scope="module")
+def patched_httpx():
+    """Patch httpx.AsyncClient.post and .get once for the whole module."""
+    with (
+        patch.object(httpx.AsyncClient, "post", new_callable=AsyncMock) as post,
+        patch.object(httpx.AsyncClient, "get", new_callable=AsyncMock) as get,
+    ):
+        yield post, get
+
+
+@pytest.fixture
+def mock_post(patched_httpx):
+    """Patched AsyncClient.post with no calls, return value or side effect."""
+    post, _ = patched_httpx
+    post.reset_mock(return_value=True, side_effect=True)
+    return post
+
+
+@pytest.fixture
+def mock_get(patched_httpx):
+    """Patched AsyncClient.get with no calls, return value or side effect."""
+    _, get = patched_httpx
+    get.reset_mock(return_value=True, side_effect=True)
+    return get
+
+
 class TestMLAPIClientEmbed:
     """Test suite for embedding operations."""
 
     @pytest.mark.asyncio
-    async def test_embed_single_text(self, ml_client):
+    async def test_embed_single_text(self, ml_client, mock_post):
         """Verify embedding a single text works."""
-        mock_response = MagicMock()
-        mock_response.raise_for_status = MagicMock()
-        mock_response.json.return_value = {
-            "dense_vecs": [[0.1] * 1024],
-            "sparse_vecs": [{100: 0.5, 200: 0.3}],
-        }
-
-        with patch.object(
-            httpx.AsyncClient, "post", new_callable=AsyncMock
-        ) as mock_post:
-            mock_post.return_value = mock_response
+        mock_response = ok_response(
+            embed_ndjson([([0.1] * 1024, {"100": 0.5, "200": 0.3})])
+        )
+        mock_post.return_value = mock_response
 
-            result = await ml_client.embed_single("test query", is_query=True)
+        result = await ml_client.embed_single("test query", is_query=True)
 
-            assert "dense" in result
-            assert "sparse" in result
-            assert len(result["dense"]) == 1024
+        assert "dense" in result
+        assert result["sparse"] == {100: 0.5, 200: pytest.approx(0.3)}
+        assert len(result["dense"]) == 1024
 
     @pytest.mark.asyncio
-    async def test_embed_multiple_texts(self, ml_client):
+    async def test_embed_multiple_texts(self, ml_client, mock_post):
         """Verify embedding multiple texts works."""
-        mock_response = MagicMock()
-        mock_response.raise_for_status = MagicMock()
-        mock_response.json.return_value = {
-            "dense_vecs": [[0.1] * 1024, [0.2] * 1024],
-            "sparse_vecs": [{100: 0.5}, {200: 0.3}],
+        mock_response = ok_response(
+            embed_ndjson([([0.1] * 1024, {"100": 0.5}), ([0.2] * 1024, {"200": 0.3})])
+        )
+        mock_post.return_value = mock_response
+
+        result = await ml_client.embed(["text 1", "text 2"])
+
+        assert result["dense_vecs"].shape == (2, 1024)
+        assert result["dense_vecs"].dtype == np.float32
+        indices, values = result["sparse_vecs"][0]
+        assert indices.dtype == np.int32 and values.dtype == np.float32
+        assert indices.tolist() == [100]
+        assert values.tolist() == [0.5]
+
+        request = mock_post.call_args.kwargs
+        assert request["headers"]["Content-Type"] == "application/msgpack"
+        assert msgpack.unpackb(request["content"]) == {
+            "text": ["text 1", "text 2"],
+            "is_query": False,
         }
 
-        with patch.object(
-            httpx.AsyncClient, "post", new_callable=AsyncMock
-        ) as mock_post:
-            mock_post.return_value = mock_response
+    def test_decode_dense_vectors_roundtrip(self):
+        """Verify float16 wire vectors decode to a matching 2-D array."""
+        vectors = [[0.5, -0.25, 0.125], [1.0, 0.0, -2.0]]
 
-            result = await ml_client.embed(["text 1", "text 2"])
+        result = decode_dense_vectors([encode_dense(v) for v in vectors])
 
-            assert len(result["dense_vecs"]) == 2
-            assert len(result["sparse_vecs"]) == 2
+        assert result.shape == (2, 3)
+        assert result.tolist() == vectors
 
 
 class TestMLAPIClientRerank:
     """Test suite for reranking operations."""
 
     @pytest.mark.asyncio
-    async def test_rerank_returns_sorted_results(self, ml_client):
+    async def test_rerank_returns_sorted_results(self, ml_client, mock_post):
         """Verify reranking returns (index, score) tuples."""
-        mock_response = MagicMock()
-        mock_response.raise_for_status = MagicMock()
-        mock_response.json.return_value = {
-            "results": [
-                {"index": 2, "score": 0.95},
-                {"index": 0, "score": 0.85},
-                {"index": 1, "score": 0.75},
-            ]
-        }
-
-        with patch.object(
-            httpx.AsyncClient, "post", new_callable=AsyncMock
-        ) as mock_post:
-            mock_post.return_value = mock_response
-
-            result = await ml_client.rerank(
-                query="what is the policy",
-                documents=["doc 1", "doc 2", "doc 3"],
-                top_k=3,
-            )
-
-            assert len(result) == 3
-            assert result[0] == (2, 0.95)
-            assert result[1] == (0, 0.85)
+        mock_response = ok_response(
+            json.dumps(
+                {
+                    "results": [
+                        {"index": 2, "score": 0.95},
+                        {"index": 0, "score": 0.85},
+                        {"index": 1, "score": 0.75},
+                    ]
+                }
+            ).encode()
+        )
+        mock_post.return_value = mock_response
+
+        result = await ml_client.rerank(
+            query="what is the policy",
+            documents=["doc 1", "doc 2", "doc 3"],
+            top_k=3,
+        )
+
+        assert len(result) == 3
+        assert result[0] == (2, 0.95)
+        assert result[1] == (0, 0.85)
+        request = mock_post.call_args.kwargs
+        assert request["headers"]["Content-Type"] == "application/json"
+        assert json.loads(request["content"])["top_k"] == 3
 
 
 class TestMLAPIClientHealth:
     """Test suite for health check operations."""
 
     @pytest.mark.asyncio
-    async def test_health_check_returns_true_when_healthy(self, ml_client):
+    async def test_health_check_returns_true_when_healthy(self, ml_client, mock_get):
         """Verify health check returns True when service is up."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
+        mock_response = SimpleNamespace(status_code=200)
+        mock_get.return_value = mock_response
 
-        with patch.object(httpx.AsyncClient, "get", new_callable=AsyncMock) as mock_get:
-            mock_get.return_value = mock_response
+        result = await ml_client.health_check()
 
-            result = await ml_client.health_check()
-
-            assert result is True
+        assert result is True
 
     @pytest.mark.asyncio
-    async def test_health_check_returns_false_on_error(self, ml_client):
+    async def test_health_check_returns_false_on_error(self, ml_client, mock_get):
         """Verify health check returns False on connection error."""
-        with patch.object(httpx.AsyncClient, "get", new_callable=AsyncMock) as mock_get:
-            mock_get.side_effect = httpx.ConnectError("Connection refused")
+        mock_get.side_effect = httpx.ConnectError("Connection refused")
 
-            result = await ml_client.health_check()
+        result = await ml_client.health_check()
 
-            assert result is False
+        assert result is False
 
 
 class TestMLAPIClientLifecycle:
     """Test suite for client lifecycle management."""
 
     @pytest.mark.asyncio
-    async def test_close_closes_client(self, ml_client):
+    async def test_close_closes_client(self, fresh_ml_client):
         """Verify close properly closes the HTTP client."""
         # Force client creation
-        await ml_client._get_client()
-        assert ml_client._client is not None
+        await fresh_ml_client._get_client()
+        assert fresh_ml_client._client is not None
 
         # Close
-        await ml_client.close()
-        assert ml_client._client is None
+        await fresh_ml_client.close()
+        assert fresh_ml_client._client is None
+
+    @pytest.mark.asyncio
+    async def test_client_uses_base_url(self, ml_client):
+        """Verify requests are resolved against the configured base URL."""
+        client = await ml_client._get_client()
+
+        assert client.base_url == "http://localhost:8001"
+        assert client.build_request("GET", "/health").url == (
+            "http://localhost:8001/health"
+        )
@@ -1,10 +1,12 @@
 """Tests for model factory."""
 
 import os
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from app.config import Settings
 from app.models.model_factory import (
     ModelFactory,
     ModelProviderError,
@@ -12,14 +14,36 @@ from app.models.model_factory import (
 )
 
 
+def stream_chunk(content: str | None) -> SimpleNamespace:
+    """Build a streamed chat completion chunk carrying one delta."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content))]
+    )
+
+
+def completion(content: str | None) -> SimpleNamespace:
+    """Build a non-streaming chat completion with one message."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+
+
+HELLO_WORLD_COMPLETION = completion("Hello, world!")
+EMPTY_COMPLETION = completion(None)
+
+
+@pytest.fixture(scope="module")
+def provider():
+    """Create one OpenAI provider; tests patch its create method per test."""
+    return OpenAIProvider(api_key="test-key", model="gpt-4o")
+
+
 class TestModelFactory:
     """Test suite for ModelFactory."""
 
     def test_factory_creates_openai_provider(self):
         """Verify factory creates OpenAI provider with valid config."""
         with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
-            from app.config import Settings
-
             with patch("app.models.model_factory.settings", Settings()):
                 factory = ModelFactory()
                 provider = factory.get_provider()
@@ -29,8 +53,6 @@ class TestModelFactory:
     def test_factory_raises_error_without_api_key(self):
         """Verify factory raises error when API key is missing."""
         with patch.dict(os.environ, {"OPENAI_API_KEY": ""}, clear=False):
-            from app.config import Settings
-
             with patch(
                 "app.models.model_factory.settings", Settings(openai_api_key="")
             ):
@@ -57,19 +79,11 @@ class TestOpenAIProvider:
         assert provider.client is not None
 
     @pytest.mark.asyncio
-    async def test_generate_streaming_yields_tokens(self):
+    async def test_generate_streaming_yields_tokens(self, provider):
         """Verify streaming generation yields tokens."""
-        provider = OpenAIProvider(
-            api_key="test-key",
-            model="gpt-4o",
-        )
-
-        mock_chunk = MagicMock()
-        mock_chunk.choices = [MagicMock()]
-        mock_chunk.choices[0].delta.content = "Hello"
 
         async def mock_stream():
-            yield mock_chunk
+            yield stream_chunk("Hello")
 
         mock_response = mock_stream()
 
@@ -88,22 +102,37 @@ class TestOpenAIProvider:
             assert "Hello" in tokens
 
     @pytest.mark.asyncio
-    async def test_generate_returns_complete_response(self):
-        """Verify non-streaming generation returns complete response."""
-        provider = OpenAIProvider(
-            api_key="test-key",
-            model="gpt-4o",
-        )
+    async def test_generate_streaming_coalesces_small_deltas(self, provider):
+        """Verify small deltas are merged before being yielded."""
 
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock()]
-        mock_response.choices[0].message.content = "Hello, world!"
+        async def mock_stream():
+            for content in ["Hel", "lo", ", ", "world"]:
+                yield stream_chunk(content)
 
         with patch.object(
             provider.client.chat.completions,
             "create",
             new_callable=AsyncMock,
-            return_value=mock_response,
+            return_value=mock_stream(),
+        ):
+            tokens = [
+                token
+                async for token in provider.generate_streaming(
+                    messages=[{"role": "user", "content": "Hi"}]
+                )
+            ]
+
+            assert "".join(tokens) == "Hello, world"
+            assert len(tokens) < 4
+
+    @pytest.mark.asyncio
+    async def test_generate_returns_complete_response(self, provider):
+        """Verify non-streaming generation returns complete response."""
+        with patch.object(
+            provider.client.chat.completions,
+            "create",
+            new_callable=AsyncMock,
+            return_value=HELLO_WORLD_COMPLETION,
         ):
             result = await provider.generate(
                 messages=[{"role": "user", "content": "Hi"}]
@@ -112,25 +141,30 @@ class TestOpenAIProvider:
             assert result == "Hello, world!"
 
     @pytest.mark.asyncio
-    async def test_generate_handles_empty_response(self):
+    async def test_generate_handles_empty_response(self, provider):
         """Verify generation handles None content gracefully."""
-        provider = OpenAIProvider(
-            api_key="test-key",
-            model="gpt-4o",
-        )
-
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock()]
-        mock_response.choices[0].message.content = None
-
         with patch.object(
             provider.client.chat.completions,
             "create",
             new_callable=AsyncMock,
-            return_value=mock_response,
+            return_value=EMPTY_COMPLETION,
         ):
             result = await provider.generate(
                 messages=[{"role": "user", "content": "Hi"}]
             )
 
             assert result == ""
+
+    @pytest.mark.asyncio
+    async def test_generate_rejects_unexpected_response(self, provider):
+        """Verify a response without choices raises instead of asserting."""
+        with patch.object(
+            provider.client.chat.completions,
+            "create",
+            new_callable=AsyncMock,
+            return_value=object(),
+        ):
+            with pytest.raises(RuntimeError) as exc_info:
+                await provider.generate(messages=[{"role": "user", "content": "Hi"}])
+
+            assert "Unexpected response type" in str(exc_info.value)
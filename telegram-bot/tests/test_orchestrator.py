@@ -1,50 +1,87 @@
 """Tests for RAG orchestrator."""
 
+import os
+from collections.abc import AsyncGenerator
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from app.rag.cache import EmbeddingCache
-from app.rag.orchestrator import RAGOrchestrator, RetrievedContext
+from app.rag.orchestrator import (
+    SUMMARY_MAX_CHARS,
+    RAGOrchestrator,
+    RetrievedContext,
+    _read_summary_input,
+)
+
+SEARCH_RESULTS = [
+    {
+        "id": "chunk-1",
+        "score": 0.9,
+        "content": "Test content 1",
+        "parent_id": "parent-1",
+        "file_name": "test.md",
+        "header_path": "Test > Section",
+    },
+    {
+        "id": "chunk-2",
+        "score": 0.8,
+        "content": "Test content 2",
+        "parent_id": "parent-2",
+        "file_name": "test.md",
+        "header_path": "Test > Another",
+    },
+]
+
+PARENTS = [
+    {
+        "id": "parent-1",
+        "content": "Full parent content 1",
+        "file_name": "test.md",
+        "header_path": "Test > Section",
+    },
+    {
+        "id": "parent-2",
+        "content": "Full parent content 2",
+        "file_name": "test.md",
+        "header_path": "Test > Another",
+    },
+]
+
+
+async def stream_contains(stream: AsyncGenerator[str, None], *needles: str) -> bool:
+    """Consume a token stream until every needle has appeared, then close it."""
+    seen = ""
+    async for token in stream:
+        seen += token
+        if all(needle in seen for needle in needles):
+            await stream.aclose()
+            return True
+    return False
+
+
+class FakeQdrantDB:
+    """Qdrant stand-in returning fixed results and recording parent lookups."""
+
+    __slots__ = ("search_results", "parents", "parent_requests")
+
+    def __init__(self, search_results: list[dict], parents: list[dict]) -> None:
+        self.search_results = search_results
+        self.parents = parents
+        self.parent_requests: list[list[str]] = []
+
+    def hybrid_search(self, *args, **kwargs) -> list[dict]:
+        return self.search_results
+
+    def get_parents(self, parent_ids: list[str]) -> list[dict]:
+        self.parent_requests.append(parent_ids)
+        return self.parents
 
 
 @pytest.fixture
 def mock_db():
-    """Create mock Qdrant database."""
-    db = MagicMock()
-    db.hybrid_search.return_value = [
-        {
-            "id": "chunk-1",
-            "score": 0.9,
-            "content": "Test content 1",
-            "parent_id": "parent-1",
-            "file_name": "test.md",
-            "header_path": "Test > Section",
-        },
-        {
-            "id": "chunk-2",
-            "score": 0.8,
-            "content": "Test content 2",
-            "parent_id": "parent-2",
-            "file_name": "test.md",
-            "header_path": "Test > Another",
-        },
-    ]
-    db.get_parents.return_value = [
-        {
-            "id": "parent-1",
-            "content": "Full parent content 1",
-            "file_name": "test.md",
-            "header_path": "Test > Section",
-        },
-        {
-            "id": "parent-2",
-            "content": "Full parent content 2",
-            "file_name": "test.md",
-            "header_path": "Test > Another",
-        },
-    ]
-    return db
+    """Create fake Qdrant database; tests rebind, never mutate, the results."""
+    return FakeQdrantDB(SEARCH_RESULTS, PARENTS)
 
 
 @pytest.fixture
@@ -68,27 +105,28 @@ def mock_ml_client():
 
 
 @pytest.fixture
-def mock_llm_provider():
+def mock_llm_provider(token_stream):
     """Create mock LLM provider."""
     provider = MagicMock()
+    provider.generate_streaming = token_stream("This is ", "a test ", "response.")
+    return provider
 
-    async def mock_generate(*args, **kwargs):
-        yield "This is "
-        yield "a test "
-        yield "response."
 
-    provider.generate_streaming = mock_generate
-    return provider
+@pytest.fixture(scope="module")
+def shared_cache():
+    """Create one embedding cache for the module's orchestrators."""
+    return EmbeddingCache(max_size=100)
 
 
 @pytest.fixture
-def orchestrator(mock_db, mock_ml_client, mock_llm_provider):
-    """Create RAG orchestrator with mocked dependencies."""
+def orchestrator(mock_db, mock_ml_client, mock_llm_provider, shared_cache):
+    """Create RAG orchestrator with mocked dependencies and an empty cache."""
+    shared_cache.clear()
     return RAGOrchestrator(
         db=mock_db,
         ml_client=mock_ml_client,
         llm_provider=mock_llm_provider,
-        embedding_cache=EmbeddingCache(max_size=100),
+        embedding_cache=shared_cache,
     )
 
 
@@ -98,35 +136,55 @@ class TestRAGOrchestratorQuery:
     @pytest.mark.asyncio
     async def test_query_returns_response(self, orchestrator):
         """Verify query returns streamed response."""
-        tokens = []
-        async for token in orchestrator.query("What is the policy?"):
-            tokens.append(token)
-
-        response = "".join(tokens)
-        assert "test response" in response
-        assert "Sources" in response
+        assert await stream_contains(
+            orchestrator.query("What is the policy?"), "test response", "Sources"
+        )
 
     @pytest.mark.asyncio
     async def test_query_includes_sources(self, orchestrator):
         """Verify query includes source citations."""
-        tokens = []
-        async for token in orchestrator.query("Test query"):
-            tokens.append(token)
-
-        response = "".join(tokens)
-        assert "test.md" in response
+        assert await stream_contains(orchestrator.query("Test query"), "test.md")
 
     @pytest.mark.asyncio
     async def test_query_handles_no_results(self, orchestrator, mock_db):
         """Verify query handles empty search results."""
-        mock_db.hybrid_search.return_value = []
+        mock_db.search_results = []
 
-        tokens = []
-        async for token in orchestrator.query("Unknown query"):
-            tokens.append(token)
+        assert await stream_contains(
+            orchestrator.query("Unknown query"), "couldn't find"
+        )
+
+    @pytest.mark.asyncio
+    async def test_query_dedupes_parents_keeping_best_score(
+        self, orchestrator, mock_db
+    ):
+        """Verify each parent is fetched once and scored by its best child."""
+        mock_db.search_results = [
+            SEARCH_RESULTS[0],
+            {**SEARCH_RESULTS[1], "parent_id": "parent-1"},
+        ]
+        mock_db.parents = PARENTS[:1]
+
+        sources = []
+
+        async def capture_generate(query, contexts, chat_history=None):
+            sources.extend(contexts)
+            yield "answer"
+
+        orchestrator._generate = capture_generate
+        async for _ in orchestrator.query("Test query"):
+            pass
+
+        assert mock_db.parent_requests == [["parent-1"]]
+        assert [ctx.relevance_score for ctx in sources] == [0.95]
 
-        response = "".join(tokens)
-        assert "couldn't find" in response.lower()
+    @pytest.mark.asyncio
+    async def test_query_with_sources_returns_contexts(self, orchestrator):
+        """Verify query_with_sources returns the answer and contexts separately."""
+        response = await orchestrator.query_with_sources("What is the policy?")
+
+        assert response.answer == "This is a test response."
+        assert [s.parent_id for s in response.sources] == ["parent-1", "parent-2"]
 
 
 class TestRAGOrchestratorCaching:
@@ -135,13 +193,12 @@ class TestRAGOrchestratorCaching:
     @pytest.mark.asyncio
     async def test_uses_cached_embedding(self, orchestrator, mock_ml_client):
         """Verify cached embeddings are reused."""
-        # First query
-        async for _ in orchestrator.query("test query"):
-            pass
-
-        # Second query with same text
-        async for _ in orchestrator.query("test query"):
-            pass
+        # The embedding is fetched before the first token, so stop there
+        # instead of streaming the whole answer
+        for _ in range(2):
+            stream = orchestrator.query("test query")
+            await anext(stream)
+            await stream.aclose()
 
         # embed_single should only be called once
         assert mock_ml_client.embed_single.call_count == 1
@@ -185,6 +242,39 @@ class TestRAGOrchestratorLifecycle:
         mock_ml_client.close.assert_called_once()
 
 
+class TestRAGOrchestratorSummarize:
+    """Test suite for document summarization."""
+
+    def test_summary_input_rereads_modified_file(self, tmp_path):
+        """Verify cached summary input is refreshed when the file changes."""
+        doc = tmp_path / "doc.md"
+        doc.write_text("first version")
+        first = _read_summary_input(str(doc), doc.stat().st_mtime_ns)
+
+        doc.write_text("second version")
+        os.utime(doc, ns=(doc.stat().st_atime_ns, doc.stat().st_mtime_ns + 1))
+        second = _read_summary_input(str(doc), doc.stat().st_mtime_ns)
+
+        assert first == "first version"
+        assert second == "second version"
+
+    def test_summary_input_reads_only_the_prompt_prefix(self, tmp_path):
+        """Verify large files are truncated to SUMMARY_MAX_CHARS on read."""
+        doc = tmp_path / "big.md"
+        doc.write_text("é" * (SUMMARY_MAX_CHARS * 3), encoding="utf-8")
+
+        content = _read_summary_input(str(doc), doc.stat().st_mtime_ns)
+
+        assert content == "é" * SUMMARY_MAX_CHARS
+
+    @pytest.mark.asyncio
+    async def test_summarize_missing_file(self, orchestrator):
+        """Verify summarize reports files it cannot find."""
+        tokens = [t async for t in orchestrator.summarize("missing.md")]
+
+        assert tokens == ["Could not find file: missing.md"]
+
+
 class TestRetrievedContext:
     """Test suite for RetrievedContext dataclass."""
 
@@ -1,39 +1,101 @@
 """Tests for Qdrant database client."""
 
+import uuid
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
+from qdrant_client import QdrantClient, models
 
+from app.chunking import ChildChunk, ParentChunk
 from app.database.qdrant_client import (
+    CHUNK_RESULT_FIELDS,
     CHUNKS_COLLECTION,
     DENSE_VECTOR_SIZE,
+    FILES_COLLECTION,
     PARENTS_COLLECTION,
+    UPSERT_BATCH_SIZE,
     QdrantDB,
 )
 
 
-@pytest.fixture
-def mock_qdrant_client():
-    """Create a mock Qdrant client."""
+@pytest.fixture(scope="module")
+def patched_qdrant_client():
+    """Patch QdrantClient once for the whole module."""
     with patch("app.database.qdrant_client.QdrantClient") as mock:
-        mock_instance = MagicMock()
-        mock.return_value = mock_instance
+        yield mock.return_value
+
+
+@pytest.fixture
+def mock_qdrant_client(patched_qdrant_client):
+    """Patched Qdrant client with no calls recorded and no collections."""
+    patched_qdrant_client.reset_mock(return_value=True, side_effect=True)
+    patched_qdrant_client.get_collections.return_value.collections = []
+    return patched_qdrant_client
 
-        mock_collections = MagicMock()
-        mock_collections.collections = []
-        mock_instance.get_collections.return_value = mock_collections
 
-        yield mock_instance
+@pytest.fixture
+def local_db():
+    """QdrantDB on qdrant-client's in-process local mode, which stores real points."""
+    with patch(
+        "app.database.qdrant_client.QdrantClient",
+        lambda **kwargs: QdrantClient(location=":memory:"),
+    ):
+        yield QdrantDB(url="http://localhost:6333")
 
 
 class TestQdrantDBInit:
     """Test suite for QdrantDB initialization."""
 
+    def test_client_prefers_grpc(self):
+        """Verify vectors go over gRPC, which packs floats as 4-byte values."""
+        with patch("app.database.qdrant_client.QdrantClient") as client_cls:
+            _db = QdrantDB(url="http://localhost:6333")  # noqa: F841
+
+        assert client_cls.call_args.kwargs["prefer_grpc"] is True
+
     def test_creates_collections_on_init(self, mock_qdrant_client):
         """Verify collections are created if they don't exist."""
         _db = QdrantDB(url="http://localhost:6333")  # noqa: F841
 
-        assert mock_qdrant_client.create_collection.call_count == 2
+        assert mock_qdrant_client.create_collection.call_count == 3
+        mock_qdrant_client.scroll.assert_not_called()
+
+    def test_chunks_collection_uses_scalar_quantization(self, mock_qdrant_client):
+        """Verify the chunks collection is created with int8 quantization."""
+        _db = QdrantDB(url="http://localhost:6333")  # noqa: F841
+
+        chunks_call = next(
+            call
+            for call in mock_qdrant_client.create_collection.call_args_list
+            if call.kwargs["collection_name"] == CHUNKS_COLLECTION
+        )
+        quantization = chunks_call.kwargs["quantization_config"]
+        assert quantization.scalar.type == "int8"
+
+    def test_text_collections_keep_payload_on_disk(self, mock_qdrant_client):
+        """Verify chunk and parent payloads are stored on disk."""
+        _db = QdrantDB(url="http://localhost:6333")  # noqa: F841
+
+        on_disk = {
+            call.kwargs["collection_name"]: call.kwargs.get("on_disk_payload")
+            for call in mock_qdrant_client.create_collection.call_args_list
+        }
+        assert on_disk[CHUNKS_COLLECTION] is True
+        assert on_disk[PARENTS_COLLECTION] is True
+
+    def test_creates_file_hash_payload_indexes_on_init(self, mock_qdrant_client):
+        """Verify chunks and parents get a file_hash keyword index."""
+        _db = QdrantDB(url="http://localhost:6333")  # noqa: F841
+
+        indexed = {
+            (call.kwargs["collection_name"], call.kwargs["field_name"])
+            for call in mock_qdrant_client.create_payload_index.call_args_list
+        }
+        assert indexed == {
+            (CHUNKS_COLLECTION, "file_hash"),
+            (PARENTS_COLLECTION, "file_hash"),
+        }
 
     def test_skips_creation_if_collections_exist(self, mock_qdrant_client):
         """Verify collections are not recreated if they exist."""
@@ -41,39 +103,95 @@ class TestQdrantDBInit:
         mock_collection1.name = CHUNKS_COLLECTION
         mock_collection2 = MagicMock()
         mock_collection2.name = PARENTS_COLLECTION
+        mock_collection3 = MagicMock()
+        mock_collection3.name = FILES_COLLECTION
 
         mock_qdrant_client.get_collections.return_value.collections = [
             mock_collection1,
             mock_collection2,
+            mock_collection3,
         ]
 
         _db = QdrantDB(url="http://localhost:6333")  # noqa: F841
 
         assert mock_qdrant_client.create_collection.call_count == 0
 
+    def test_backfills_files_collection_from_existing_parents(self, mock_qdrant_client):
+        """Verify a new files collection is populated from existing parents."""
+        mock_collection1 = MagicMock()
+        mock_collection1.name = CHUNKS_COLLECTION
+        mock_collection2 = MagicMock()
+        mock_collection2.name = PARENTS_COLLECTION
+        mock_qdrant_client.get_collections.return_value.collections = [
+            mock_collection1,
+            mock_collection2,
+        ]
+
+        mock_point1 = MagicMock()
+        mock_point1.payload = {"file_hash": "hash1", "file_name": "a.md"}
+        mock_point2 = MagicMock()
+        mock_point2.payload = {"file_hash": "hash1", "file_name": "a.md"}
+        mock_qdrant_client.scroll.return_value = ([mock_point1, mock_point2], None)
+
+        _db = QdrantDB(url="http://localhost:6333")  # noqa: F841
+
+        mock_qdrant_client.upsert.assert_called_once()
+        call_args = mock_qdrant_client.upsert.call_args
+        assert call_args.kwargs["collection_name"] == FILES_COLLECTION
+        assert len(call_args.kwargs["points"]) == 1
+
 
 class TestQdrantDBFileOperations:
     """Test suite for file-related operations."""
 
     def test_file_exists_returns_true_when_found(self, mock_qdrant_client):
         """Verify file_exists returns True when file is found."""
-        mock_qdrant_client.scroll.return_value = ([MagicMock()], None)
+        mock_qdrant_client.count.return_value = MagicMock(count=3)
 
         db = QdrantDB(url="http://localhost:6333")
         result = db.file_exists("test_hash_123")
 
         assert result is True
-        mock_qdrant_client.scroll.assert_called_once()
+        mock_qdrant_client.count.assert_called_once()
+        mock_qdrant_client.scroll.assert_not_called()
+
+    def test_file_exists_remembers_indexed_files(self, mock_qdrant_client):
+        """Verify a positive check is cached until the file is deleted."""
+        mock_qdrant_client.count.return_value = MagicMock(count=3)
+
+        db = QdrantDB(url="http://localhost:6333")
+
+        assert db.file_exists("h1") is True
+        assert db.file_exists("h1") is True
+        assert mock_qdrant_client.count.call_count == 1
+
+        db.delete_file("h1")
+        db.file_exists("h1")
+        assert mock_qdrant_client.count.call_count == 2
 
     def test_file_exists_returns_false_when_not_found(self, mock_qdrant_client):
         """Verify file_exists returns False when file is not found."""
-        mock_qdrant_client.scroll.return_value = ([], None)
+        mock_qdrant_client.count.return_value = MagicMock(count=0)
 
         db = QdrantDB(url="http://localhost:6333")
         result = db.file_exists("nonexistent_hash")
 
         assert result is False
 
+    def test_files_exist_returns_indexed_subset(self, mock_qdrant_client):
+        """Verify files_exist checks all hashes in a single retrieve."""
+        mock_point = MagicMock()
+        mock_point.payload = {"file_hash": "hash1"}
+        mock_qdrant_client.retrieve.return_value = [mock_point]
+
+        db = QdrantDB(url="http://localhost:6333")
+        result = db.files_exist(["hash1", "hash2"])
+
+        assert result == {"hash1"}
+        call_args = mock_qdrant_client.retrieve.call_args
+        assert call_args.kwargs["collection_name"] == FILES_COLLECTION
+        assert len(call_args.kwargs["ids"]) == 2
+
     def test_get_all_files_returns_file_list(self, mock_qdrant_client):
         """Verify get_all_files returns list of files."""
         mock_point = MagicMock()
@@ -86,13 +204,24 @@ class TestQdrantDBFileOperations:
         assert len(files) == 1
         assert files[0]["file_hash"] == "hash1"
         assert files[0]["file_name"] == "test.md"
+        call_args = mock_qdrant_client.scroll.call_args
+        assert call_args.kwargs["collection_name"] == FILES_COLLECTION
 
-    def test_delete_file_deletes_from_both_collections(self, mock_qdrant_client):
-        """Verify delete_file removes from both chunks and parents."""
+    def test_delete_file_deletes_from_all_collections(self, mock_qdrant_client):
+        """Verify delete_file removes from chunks, parents and files."""
         db = QdrantDB(url="http://localhost:6333")
         db.delete_file("test_hash")
 
-        assert mock_qdrant_client.delete.call_count == 2
+        assert mock_qdrant_client.delete.call_count == 3
+        waits = {
+            call.kwargs["collection_name"]: call.kwargs.get("wait", True)
+            for call in mock_qdrant_client.delete.call_args_list
+        }
+        assert waits == {
+            CHUNKS_COLLECTION: False,
+            PARENTS_COLLECTION: True,
+            FILES_COLLECTION: True,
+        }
 
 
 class TestQdrantDBStoreOperations:
@@ -101,18 +230,20 @@ class TestQdrantDBStoreOperations:
     def test_store_chunks_calls_upsert(self, mock_qdrant_client):
         """Verify store_chunks calls upsert with correct data."""
         chunks = [
-            {
-                "id": "chunk-id-1",
-                "content": "test content",
-                "parent_id": "parent-id-1",
-                "file_hash": "hash123",
-                "file_name": "test.md",
-                "chunk_index": 0,
-                "header_path": "Test > Section",
-            }
+            ChildChunk(
+                id="chunk-id-1",
+                content="test content",
+                parent_id="parent-id-1",
+                file_hash="hash123",
+                file_name="test.md",
+                chunk_index=0,
+                header_path="Test > Section",
+            )
+        ]
+        dense_vectors = np.full((1, DENSE_VECTOR_SIZE), 0.1, dtype=np.float32)
+        sparse_vectors = [
+            (np.array([100, 200], dtype=np.int32), np.array([0.5, 0.3], np.float32))
         ]
-        dense_vectors = [[0.1] * DENSE_VECTOR_SIZE]
-        sparse_vectors = [{100: 0.5, 200: 0.3}]
 
         db = QdrantDB(url="http://localhost:6333")
         db.store_chunks(chunks, dense_vectors, sparse_vectors)
@@ -121,25 +252,53 @@ class TestQdrantDBStoreOperations:
         call_args = mock_qdrant_client.upsert.call_args
         assert call_args.kwargs["collection_name"] == CHUNKS_COLLECTION
 
+    def test_store_chunks_upserts_in_batches(self, mock_qdrant_client):
+        """Verify large chunk lists are split and only the last batch waits."""
+        chunks = [
+            ChildChunk(
+                id=f"chunk-id-{i}",
+                content="test content",
+                parent_id="parent-id-1",
+                file_hash="hash123",
+                file_name="test.md",
+                chunk_index=i,
+                header_path="Test",
+            )
+            for i in range(UPSERT_BATCH_SIZE + 1)
+        ]
+        dense_vectors = np.full((len(chunks), DENSE_VECTOR_SIZE), 0.1, np.float32)
+        sparse = (np.array([100], dtype=np.int32), np.array([0.5], np.float32))
+        sparse_vectors = [sparse] * len(chunks)
+
+        db = QdrantDB(url="http://localhost:6333")
+        db.store_chunks(chunks, dense_vectors, sparse_vectors)
+
+        first, last = mock_qdrant_client.upsert.call_args_list
+        assert len(first.kwargs["points"]) == UPSERT_BATCH_SIZE
+        assert first.kwargs["wait"] is False
+        assert len(last.kwargs["points"]) == 1
+        assert last.kwargs["wait"] is True
+
     def test_store_parents_calls_upsert(self, mock_qdrant_client):
         """Verify store_parents calls upsert with correct data."""
         parents = [
-            {
-                "id": "parent-id-1",
-                "content": "parent content",
-                "file_hash": "hash123",
-                "file_name": "test.md",
-                "header_path": "Test",
-                "child_ids": ["child-1", "child-2"],
-            }
+            ParentChunk(
+                id="parent-id-1",
+                content="parent content",
+                file_hash="hash123",
+                file_name="test.md",
+                header_path="Test",
+                child_ids=["child-1", "child-2"],
+            )
         ]
 
         db = QdrantDB(url="http://localhost:6333")
         db.store_parents(parents)
 
-        mock_qdrant_client.upsert.assert_called_once()
-        call_args = mock_qdrant_client.upsert.call_args
-        assert call_args.kwargs["collection_name"] == PARENTS_COLLECTION
+        assert mock_qdrant_client.upsert.call_count == 2
+        parents_call, files_call = mock_qdrant_client.upsert.call_args_list
+        assert parents_call.kwargs["collection_name"] == PARENTS_COLLECTION
+        assert files_call.kwargs["collection_name"] == FILES_COLLECTION
 
 
 class TestQdrantDBSearchOperations:
@@ -171,6 +330,9 @@ class TestQdrantDBSearchOperations:
         assert results[0]["id"] == "chunk-1"
         assert results[0]["score"] == 0.95
         assert results[0]["content"] == "test content"
+        call_kwargs = mock_qdrant_client.query_points.call_args.kwargs
+        assert call_kwargs["with_payload"].include == CHUNK_RESULT_FIELDS
+        assert not call_kwargs.get("with_vectors", False)
 
     def test_hybrid_search_with_file_filter(self, mock_qdrant_client):
         """Verify hybrid_search applies file filter."""
@@ -186,6 +348,54 @@ class TestQdrantDBSearchOperations:
         )
 
         mock_qdrant_client.query_points.assert_called_once()
+        prefetch = mock_qdrant_client.query_points.call_args.kwargs["prefetch"]
+        for branch in prefetch:
+            (condition,) = branch.filter.must
+            assert isinstance(condition.match, models.MatchAny)
+            assert condition.match.any == ["hash1", "hash2"]
+
+    def test_hybrid_search_sets_hnsw_ef(self, mock_qdrant_client):
+        """Verify the dense prefetch searches with the requested HNSW ef."""
+        mock_qdrant_client.query_points.return_value = MagicMock(points=[])
+
+        db = QdrantDB(url="http://localhost:6333")
+        db.hybrid_search(
+            query_dense=[0.1] * DENSE_VECTOR_SIZE,
+            query_sparse={100: 0.5},
+            hnsw_ef=32,
+        )
+
+        dense, _ = mock_qdrant_client.query_points.call_args.kwargs["prefetch"]
+        assert dense.params.hnsw_ef == 32
+        assert dense.params.quantization.rescore is True
+
+    def test_hybrid_search_batch_sends_one_request(self, mock_qdrant_client):
+        """Verify hybrid_search_batch packs every query into one call."""
+        mock_point = MagicMock()
+        mock_point.id = "chunk-1"
+        mock_point.score = 0.95
+        mock_point.payload = {
+            "content": "test content",
+            "parent_id": "parent-1",
+            "file_name": "test.md",
+            "header_path": "Test",
+        }
+        mock_qdrant_client.query_batch_points.return_value = [
+            MagicMock(points=[mock_point]),
+            MagicMock(points=[]),
+        ]
+
+        db = QdrantDB(url="http://localhost:6333")
+        results = db.hybrid_search_batch(
+            queries_dense=[[0.1] * DENSE_VECTOR_SIZE, [0.2] * DENSE_VECTOR_SIZE],
+            queries_sparse=[{100: 0.5}, {200: 0.3}],
+        )
+
+        mock_qdrant_client.query_batch_points.assert_called_once()
+        requests = mock_qdrant_client.query_batch_points.call_args.kwargs["requests"]
+        assert len(requests) == 2
+        assert [len(r) for r in results] == [1, 0]
+        assert results[0][0]["content"] == "test content"
 
     def test_get_parents_returns_parent_data(self, mock_qdrant_client):
         """Verify get_parents returns parent chunks."""
@@ -204,3 +414,67 @@ class TestQdrantDBSearchOperations:
         assert len(parents) == 1
         assert parents[0]["id"] == "parent-1"
         assert parents[0]["content"] == "parent content"
+        with_payload = mock_qdrant_client.retrieve.call_args.kwargs["with_payload"]
+        assert "child_ids" not in with_payload.include
+
+
+class TestQdrantDBLocalRoundTrip:
+    """Round trips through an in-process Qdrant instead of a mock."""
+
+    def test_store_search_and_delete_round_trip(self, local_db):
+        """Verify stored chunks and parents come back through every reader."""
+        parent_id = str(uuid.uuid4())
+        child_id = str(uuid.uuid4())
+        local_db.store_parents(
+            [
+                ParentChunk(
+                    id=parent_id,
+                    content="parent content",
+                    file_hash="hash123",
+                    file_name="test.md",
+                    header_path="Test",
+                    child_ids=[child_id],
+                )
+            ]
+        )
+        local_db.store_chunks(
+            [
+                ChildChunk(
+                    id=child_id,
+                    content="child content",
+                    parent_id=parent_id,
+                    file_hash="hash123",
+                    file_name="test.md",
+                    chunk_index=0,
+                    header_path="Test",
+                )
+            ],
+            np.full((1, DENSE_VECTOR_SIZE), 0.1, dtype=np.float32),
+            [(np.array([100], dtype=np.int32), np.array([0.5], np.float32))],
+        )
+
+        results = local_db.hybrid_search(
+            query_dense=[0.1] * DENSE_VECTOR_SIZE,
+            query_sparse={100: 0.5},
+            file_hashes=["hash123"],
+        )
+        assert [r["parent_id"] for r in results] == [parent_id]
+        assert results[0]["content"] == "child content"
+
+        parents = local_db.get_parents([parent_id])
+        assert parents[0]["content"] == "parent content"
+        assert local_db.files_exist(["hash123", "other"]) == {"hash123"}
+        assert local_db.get_all_files() == [
+            {"file_hash": "hash123", "file_name": "test.md"}
+        ]
+
+        local_db.delete_file("hash123")
+
+        assert local_db.file_exists("hash123") is False
+        assert local_db.get_all_files() == []
+        assert (
+            local_db.hybrid_search(
+                query_dense=[0.1] * DENSE_VECTOR_SIZE, query_sparse={100: 0.5}
+            )
+            == []
+        )